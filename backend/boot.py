@@ -1,82 +1,172 @@
 import network
 import time
+import usocket
+import urandom
 from machine import Pin
-import _thread
-import webrepl
-import ntptime
 from config import WIFI_SSID, WIFI_PASSWORD
 
 # Close LED, only for LuatOS esp32c3
-led1 = Pin(12, Pin.OUT)
-led2 = Pin(13, Pin.OUT)
-led1.off()
-led2.off()
-
-# Global flag to track connection state
-wifi_connected = False
-connection_thread_running = True
-first_boot = True  # Flag to identify first boot
-
-def connect_to_wifi():
-    """Attempt to connect to WiFi"""
-    global wifi_connected
+# Drive the pins low as part of construction and keep no references to them
+Pin(12, Pin.OUT, value=0)
+Pin(13, Pin.OUT, value=0)
+
+# Wireless config: Station mode, created once and shared by all WiFi code
+_STATION = network.WLAN(network.STA_IF)
+_STATION.active(True)
+
+CHECK_INTERVAL_S = 5  # Seconds between background connection checks
+
+# NTP server, resolved once and cached so reconnects skip the DNS lookup
+NTP_HOST = 'ntp1.aliyun.com'
+NTP_IP_FILE = 'ntp_ip.txt'
+NTP_SYNC_FILE = 'ntp_last_sync.txt'
+NTP_SYNC_INTERVAL_S = 6 * 3600  # Re-sync at most this often, regardless of reconnects
+_ntp_ip = None
+_last_ntp_sync = 0
+
+def _load_ntp_ip():
+    """Read the NTP server IP cached by a previous boot"""
+    try:
+        with open(NTP_IP_FILE, 'r') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+def _resolve_ntp_ip():
+    """Resolve the NTP server and persist its IP for warm boots"""
+    try:
+        ip = usocket.getaddrinfo(NTP_HOST, 123)[0][-1][0]
+    except OSError:
+        return None
+    try:
+        with open(NTP_IP_FILE, 'w') as f:
+            f.write(ip)
+    except OSError:
+        pass
+    return ip
+
+def _load_last_ntp_sync():
+    """Read the time of the last successful NTP sync, persisted across reboots"""
+    try:
+        with open(NTP_SYNC_FILE, 'r') as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return 0
+
+def _save_last_ntp_sync(timestamp):
+    try:
+        with open(NTP_SYNC_FILE, 'w') as f:
+            f.write(str(timestamp))
+    except OSError:
+        pass
+
+def sync_time(force=False):
+    """
+    Set the RTC from NTP, using the cached server IP when available.
+    Skipped if the last sync is recent, unless force is set.
+    """
+    global _ntp_ip, _last_ntp_sync
+    now = time.time()
+    # A clock behind the last sync means the RTC was reset, so sync regardless
+    if not force and _last_ntp_sync and _last_ntp_sync <= now < _last_ntp_sync + NTP_SYNC_INTERVAL_S:
+        return
     
-    # Wireless config: Station mode
-    station = network.WLAN(network.STA_IF)
-    station.active(True)
+    import ntptime  # Deferred so boot does not pay for it when no sync is due
+    if _ntp_ip is None:
+        _ntp_ip = _resolve_ntp_ip()
+    ntptime.host = _ntp_ip or NTP_HOST
+    try:
+        ntptime.settime()
+    except OSError:
+        if ntptime.host == NTP_HOST:
+            raise
+        # Cached IP may be stale, retry once by hostname and re-resolve next time
+        _ntp_ip = None
+        ntptime.host = NTP_HOST
+        ntptime.settime()
+    _last_ntp_sync = time.time()
+    _save_last_ntp_sync(_last_ntp_sync)
+
+_ntp_ip = _load_ntp_ip()
+_last_ntp_sync = _load_last_ntp_sync()
+
+def connect_to_wifi(max_attempts=10, retry_delay=15, boot_budget=45):
+    """
+    Attempt to connect to WiFi.
+    retry_delay is the seconds to wait for association per attempt; boot_budget
+    caps the total seconds spent so the caller is not starved.
+    """
+    station = _STATION
     
-    max_attempts = 10
-    retry_delay = 15
+    # Already associated, nothing to do
+    if station.isconnected():
+        return True
     
     # Attempt to connect
     attempt_count = 0
+    boot_start = time.ticks_ms()
     while attempt_count < max_attempts and not station.isconnected():
         try:
-            # Wait for connection with timeout
-            start_time = time.time()
+            # Wait for connection with timeout, polling with exponential backoff
+            start_time = time.ticks_ms()
             station.connect(WIFI_SSID, WIFI_PASSWORD)
-            while time.time() - start_time < retry_delay:
+            delay = 0.05
+            while time.ticks_diff(time.ticks_ms(), start_time) < retry_delay * 1000:
                 if station.isconnected():
-                    ntptime.host = 'ntp1.aliyun.com'
-                    ntptime.settime()
+                    sync_time()
                     break
-                time.sleep(0.5)
+                time.sleep(delay + urandom.getrandbits(6) / 1000)
+                delay = min(delay * 2, 1.0)
                 
             if station.isconnected():
-                wifi_connected = True
                 return True
             
             attempt_count += 1
             
         except Exception as e:
             attempt_count += 1
+        
+        if attempt_count >= max_attempts:
+            break
+        # Back off between attempts instead of re-associating immediately,
+        # but give up if the backoff would run past the boot budget
+        backoff = min(2 ** attempt_count, 60)
+        if time.ticks_diff(time.ticks_ms(), boot_start) + backoff * 1000 >= boot_budget * 1000:
+            break
+        time.sleep(backoff)
     return False
 
+def wifi_is_up():
+    """Returns True if the station is associated; the driver is the single source of truth"""
+    return _STATION.isconnected()
+
 def connection_manager():
     """Manages WiFi connection in a background thread"""
-    global wifi_connected, connection_thread_running, first_boot
-    
-    # Skip initial connection as it's handled in the main path
-    if first_boot:
-        first_boot = False
-        time.sleep(60)  # Give some time before starting the background checks
-    
-    # Background monitoring and reconnection
-    while connection_thread_running:
-        station = network.WLAN(network.STA_IF)
-        
-        if not station.isconnected():
-            wifi_connected = False
+    # Makes the first connection attempt straight away, then keeps watching.
+    # Stock MicroPython exposes no WLAN disconnect callback, so a short poll stands in for one.
+    # Runs for as long as _manager_running is held.
+    while _manager_running.locked():
+        if not wifi_is_up():
             connect_to_wifi()
-        else:
-            if not wifi_connected:
-                wifi_connected = True
                 
         # Sleep before checking again
-        time.sleep(60)
+        time.sleep(CHECK_INTERVAL_S)
+
+_manager_running = None # Held while the connection manager thread should keep running
+
+def start_connection_manager():
+    """Starts the connection manager thread"""
+    global _manager_running
+    import _thread  # Deferred: only the manager needs threads
+    _manager_running = _thread.allocate_lock()
+    _manager_running.acquire()
+    _thread.start_new_thread(connection_manager, ())
 
-# First connection attempt - blocking during first boot
-connect_to_wifi()
+def stop_connection_manager():
+    """Signals the connection manager thread to exit after its current check"""
+    if _manager_running and _manager_running.locked():
+        _manager_running.release()
 
-# Start WiFi connection management in a separate thread for future reconnections
-_thread.start_new_thread(connection_manager, ())
+# Connect and manage WiFi in a separate thread, so boot.py returns at once and
+# main.py brings up the fingerprint sensor and servo while the radio associates
+start_connection_manager()
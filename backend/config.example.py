@@ -17,7 +17,7 @@ BAUD_RATE = 57600
 DEVICE_ADDR = 0xFFFFFFFF # default address, suggest to change by fingerprint.set_addr()
 PACKET_HEAD = 0xEF01 # no need to change
 MAX_FINGER_ID = 100  # Maximum number of fingerprints that can be stored
-CHIP_SN = "0" # use fingerprint.get_chip_sn() to get the serial number of the fingerprint module
+CHIP_SN = "0" # hex string, use fingerprint.get_chip_sn().hex().upper() to get the serial number of the fingerprint module
 # If you don't want to verify the serial number, set it to "0"
 
 # Servo Configuration
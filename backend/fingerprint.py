@@ -5,44 +5,106 @@ All comments are in English.
 """
 import machine
 from machine import Pin
-import utime
 import ustruct
 import uasyncio
+from micropython import const
 from config import (
-    UART_ID, TX_PIN, RX_PIN, BAUD_RATE, DEVICE_ADDR, PACKET_HEAD, CHIP_SN,
-    TIMEOUT_MS, MAX_FINGER_ID, ENROLL_COUNT, SCORE_LEVEL_VERIFY, DEBUG # Added DEBUG
+    UART_ID, TX_PIN, RX_PIN, TOUCH_OUT_PIN, BAUD_RATE, DEVICE_ADDR, PACKET_HEAD, CHIP_SN,
+    TIMEOUT_MS, ENROLL_TIMEOUT_MS, MAX_FINGER_ID, ENROLL_COUNT, SCORE_LEVEL_VERIFY, DEBUG # Added DEBUG
 )
 from logger import logger
 from fingerprint_db import fingerprint_database
 
 # Command Codes from the manual
-CMD_AUTO_ENROLL = 0x31
-CMD_AUTO_IDENTIFY = 0x32
-CMD_DELETE_CHAR = 0x0C
-CMD_CANCEL = 0x30
+CMD_AUTO_ENROLL = const(0x31)
+CMD_AUTO_IDENTIFY = const(0x32)
+CMD_DELETE_CHAR = const(0x0C)
+CMD_CANCEL = const(0x30)
 
 # Packet Identifiers
-PID_COMMAND = 0x01
-PID_ACK = 0x07
+PID_COMMAND = const(0x01)
+PID_ACK = const(0x07)
 # PID_DATA = 0x02 # Not directly handled in this simplified version for auto commands
 # PID_END_DATA = 0x08 # Not directly handled
 
+UART_RXBUF = const(256) # Bytes of interrupt-fed receive ring buffer in the UART driver
+
+_PACKET_HEAD_BYTES = ustruct.pack('>H', PACKET_HEAD)
+# Expected module SN as raw bytes, or None when verification is disabled
+_CHIP_SN_BYTES = None if CHIP_SN == "0" else bytes.fromhex(CHIP_SN)
+# PID + packet length of an ACK carrying only a confirm code
+_ACK12_PID_LEN = bytes([PID_ACK, 0x00, 0x03])
+
+# Confirm code messages, indexed by code. Based on page 7-8 of the manual; None marks unused codes.
+_ERRORS = (
+    "Command execution OK", # 0x00
+    "Data packet reception error", "No finger on sensor", # 0x01-0x02
+    "Fingerprint image entry failed", "Fingerprint image too dry/light to generate features", # 0x03-0x04
+    "Fingerprint image too wet/smudged to generate features", "Fingerprint image too messy to generate features", # 0x05-0x06
+    "Fingerprint image normal, but too few feature points (or area too small) to generate features", # 0x07
+    "Fingerprints do not match", "Fingerprint not found", # 0x08-0x09
+    "Feature merging failed", "Fingerprint library access address out of range", # 0x0a-0x0b
+    "Error reading template from library or template invalid", "Feature upload failed", # 0x0c-0x0d
+    "Module cannot receive subsequent data packets", "Image upload failed", # 0x0e-0x0f
+    "Template deletion failed", "Fingerprint library clearing failed", # 0x10-0x11
+    None, "Incorrect password", None, "No valid original image in buffer to generate image", # 0x12-0x15
+    None, "Residual fingerprint or finger not moved between two collections", # 0x16-0x17
+    "Error reading/writing FLASH", None, "Invalid register number", # 0x18-0x1a
+    "Register setting content error", "Notepad page number error", # 0x1b-0x1c
+    None, None, "Fingerprint library full", None, None, # 0x1d-0x21
+    "Fingerprint template not empty (when trying to overwrite with no-overwrite flag)", # 0x22
+    "Fingerprint template is empty (e.g., for 1:1 verify)", "Fingerprint library is empty", # 0x23-0x24
+    "Enrollment count setting error", "Timeout", # 0x25-0x26
+    "Fingerprint already exists (duplicate)", # 0x27
+)
+
+try:
+    from fp_checksum import checksum as _checksum
+except (ImportError, SyntaxError):
+    # Firmware without the native emitter can't compile the viper version
+    def _checksum(buf, start, end):
+        """Sum of buf[start:end], truncated to 16 bits."""
+        return sum(buf[start:end]) & 0xFFFF
+
 class Fingerprint:
     def __init__(self):
         # Configure UART
         # Ensure TX_PIN and RX_PIN are correctly set in config.py
         # UART is initialized with TIMEOUT_MS for read operations.
-        self.uart = machine.UART(UART_ID, baudrate=BAUD_RATE, tx=TX_PIN, rx=RX_PIN, timeout=TIMEOUT_MS)
+        # The driver fills rxbuf from the UART RX interrupt; keep it big enough for several
+        # packets so nothing is dropped while the event loop is busy elsewhere.
+        self.uart = machine.UART(UART_ID, baudrate=BAUD_RATE, tx=TX_PIN, rx=RX_PIN, timeout=TIMEOUT_MS, rxbuf=UART_RXBUF)
+        # Stream wrapper so async reads sleep until the driver reports data, instead of busy-looping
+        self._sreader = uasyncio.StreamReader(self.uart)
+        # One command/response exchange at a time: the stream and the receive buffer are shared,
+        # and uasyncio allows only one task to wait on a stream
+        self._uart_lock = uasyncio.Lock()
+        # Module's touch output, high while a finger is on the sensor
+        self.touch_pin = Pin(TOUCH_OUT_PIN, Pin.IN)
+        # Reusable receive buffer, large enough for any ACK (the SN response is 44 bytes)
+        self._rx_buf = bytearray(64)
+        self._rx_mv = memoryview(self._rx_buf)
+        # Reusable transmit buffer, large enough for every command this class sends
+        self._tx_buf = bytearray(32)
         self.device_addr = DEVICE_ADDR
+        # Header + address, the fixed first 6 bytes of every packet we send
+        self._hdr_prefix = _PACKET_HEAD_BYTES + ustruct.pack('>I', self.device_addr)
         self.logger = logger
         self.db = fingerprint_database
         self._cancel_flag = False # Internal flag for cancellation logic
         
+        # Commands without variable parameters always produce the same bytes; build them once
+        self._pkt_led_off = bytes(self._build_packet(PID_COMMAND, 0x3C, bytearray([0x04, 0x00, 0x00, 0x00])))
+        self._pkt_cancel = bytes(self._build_packet(PID_COMMAND, CMD_CANCEL))
+        self._pkt_reset = bytes(self._build_packet(PID_COMMAND, 0x3B, bytearray()))
+        self._pkt_get_sn = bytes(self._build_packet(PID_COMMAND, 0x34, bytearray()))
+        self._pkt_blink = {} # (color, duration, count) -> packet, filled on first use
+        
         self._turn_off_led()
         
-        chip_sn = self._get_chip_sn()
-        if CHIP_SN != chip_sn:
-            self.logger.error("Chip SN not match.Now Module SN: {}".format(chip_sn))
+        chip_sn = self.get_chip_sn()
+        if _CHIP_SN_BYTES is not None and _CHIP_SN_BYTES != chip_sn:
+            self.logger.error("Chip SN not match.Now Module SN: {}".format(chip_sn.hex().upper() if chip_sn else None))
             #raise ValueError("Chip SN does not match. Exiting program.")
         
 
@@ -52,18 +114,17 @@ class Fingerprint:
         print(self._receive_packet())
         
     def reset(self):
-        packet = self._build_packet(PID_COMMAND, 0x3B, bytearray())
-        self._send_packet(packet)
+        self._send_packet(self._pkt_reset)
         print(self._receive_packet())
         
     def get_chip_sn(self):
         """
         Retrieves the chip's unique serial number (SN) from the fingerprint module.
-        Returns the SN as a string if successful, or None if there's an error.
+        Returns the raw 32-byte SN if successful, or None if there's an error.
+        Use .hex().upper() on the result for the form expected in config.CHIP_SN.
         """
-        # Build the command packet to request the chip's SN
-        packet = self._build_packet(PID_COMMAND, 0x34, bytearray())
-        self._send_packet(packet)
+        # Send the command packet to request the chip's SN
+        self._send_packet(self._pkt_get_sn)
 
         # Receive the response packet
         response_packet = self._receive_packet()
@@ -76,12 +137,8 @@ class Fingerprint:
             self.logger.error("Invalid response packet length for chip SN.")
             return None
 
-        # Extract the PID, packet length, confirm code, and SN
-        pid = response_packet[6]
-        packet_length = ustruct.unpack('>H', response_packet[7:9])[0]
-        confirm_code = response_packet[9]
-        sn_bytes = response_packet[10:42]  # SN is 32 bytes long
-        checksum = ustruct.unpack('>H', response_packet[42:44])[0]
+        # Extract the PID, packet length, confirm code, SN (32 bytes) and checksum in one go
+        pid, packet_length, confirm_code, sn_bytes, checksum = ustruct.unpack_from('>BHB32sH', response_packet, 6)
 
         # Verify the PID and packet length
         if pid != PID_ACK or packet_length != 35:  # 35 = 1 (confirm code) + 32 (SN) + 2 (checksum)
@@ -89,8 +146,7 @@ class Fingerprint:
             return None
 
         # Verify the checksum
-        data_for_checksum = response_packet[6:42]  # PID + packet length + confirm code + SN
-        calculated_checksum = self._calculate_checksum(data_for_checksum)
+        calculated_checksum = self._calculate_checksum(response_packet, 6, 42)  # PID + packet length + confirm code + SN
         if calculated_checksum != checksum:
             self.logger.error("Checksum mismatch in SN response.")
             return None
@@ -101,15 +157,13 @@ class Fingerprint:
             self.logger.error("Failed to retrieve chip SN: {}".format(error_msg))
             return None
 
-        # Convert the SN bytes to a string
-        sn_str = sn_bytes.hex().upper()  # Convert to uppercase hexadecimal string
-        return sn_str
+        return sn_bytes
 
 
     def _turn_off_led(self):
-        packet = self._build_packet(PID_COMMAND, 0x3C, bytearray([0x04, 0x00, 0x00, 0x00]))
-        self._send_packet(packet)
-        await self._receive_packet_async()
+        # Called from __init__, before the event loop runs, so read the ACK synchronously
+        self._send_packet(self._pkt_led_off)
+        self._recv_ack12()
         
     def blink_led(self, color, duration, count):
         """
@@ -118,263 +172,251 @@ class Fingerprint:
         :param duration: Blink duration (in seconds), range 1-100, where 1 represents 0.1 seconds
         :param count: Number of blinks, 0 means infinite loop, maximum value is 255
         """
-        # Function code: 0x02 indicates blinking LED
-        function_code = 0x02
-        
-        # Start color and end color are the same
-        start_color = color
-        end_color = color
-        
-        # Duty cycle: High 4 bits are 3, low 4 bits are 8, indicating a high-to-low level duration ratio of 3:8
-        duty_cycle = 0x82
-        
-        # Loop count
-        loop_count = count
-        
-        # Time parameter: duration * 10, because 1 represents 0.1 seconds
-        time_param = int(duration * 10)
-        
-        # Build the parameter list
-        params = bytearray([function_code, start_color, duty_cycle, loop_count, time_param])
-        
-        # Build and send the command packet
-        packet = self._build_packet(PID_COMMAND, 0x3C, params)
+        # Only a few patterns are used (match/no match), so reuse the packet once built
+        key = (color, duration, count)
+        packet = self._pkt_blink.get(key)
+        if packet is None:
+            # Function code: 0x02 indicates blinking LED
+            function_code = 0x02
+            
+            # Start color and end color are the same
+            start_color = color
+            end_color = color
+            
+            # Duty cycle: High 4 bits are 3, low 4 bits are 8, indicating a high-to-low level duration ratio of 3:8
+            duty_cycle = 0x82
+            
+            # Loop count
+            loop_count = count
+            
+            # Time parameter: duration * 10, because 1 represents 0.1 seconds
+            time_param = int(duration * 10)
+            
+            # Build the parameter list
+            params = bytearray([function_code, start_color, duty_cycle, loop_count, time_param])
+            
+            # Build the command packet
+            packet = bytes(self._build_packet(PID_COMMAND, 0x3C, params))
+            self._pkt_blink[key] = packet
         self._send_packet(packet)
         # It's strange, use async doesn't light up.
-        self._receive_packet()
+        self._recv_ack12()
 
-    def _receive_packet(self):
+    def _recv_ack12(self):
         """
-        Receives a packet from UART. Uses the timeout set during UART initialization.
-        Returns the full response packet as bytes, or None on timeout/error.
+        Receives a 12-byte ACK that carries only a confirm code, as sent for LED commands, in one read.
+        Returns the confirm code, or None on timeout/error.
         """
-        response = bytearray()
-        
-        # Read header and address (2 + 4 = 6 bytes)
-        header_addr = self.uart.read(6)
-        if not header_addr or len(header_addr) < 6:
-            if DEBUG and not header_addr: self.logger.debug("Timeout receiving packet header.")
-            elif DEBUG: self.logger.debug("Incomplete packet header: {}".format(header_addr.hex() if header_addr else "None"))
+        ack = self.uart.read(12)
+        if not ack or len(ack) < 12:
+            if DEBUG: self.logger.debug("Timeout/Incomplete ACK.")
             return None
         
-        response.extend(header_addr)
-        if DEBUG: self.logger.debug("Recv Header+Addr: {}".format(header_addr.hex()))
-
-        if response[0:2] != ustruct.pack('>H', PACKET_HEAD):
-            self.logger.error("Invalid packet header received: {}".format(response[0:2].hex()))
+        # PID and length are fixed, so the checksum is always 0x07 + 0x00 + 0x03 + confirm code
+        confirm_code = ack[9]
+        if (ack[0:2] != _PACKET_HEAD_BYTES or ack[6:9] != _ACK12_PID_LEN
+                or ustruct.unpack_from('>H', ack, 10)[0] != 0x0A + confirm_code):
+            self.logger.error("Invalid ACK received: {}".format(ack.hex()))
             return None
+        return confirm_code
 
-        # Read PID and Packet Length (1 + 2 = 3 bytes)
-        pid_len_bytes = self.uart.read(3)
-        if not pid_len_bytes or len(pid_len_bytes) < 3:
-            if DEBUG: self.logger.debug("Timeout/Incomplete PID+Length.")
+    def _receive_packet(self):
+        """
+        Receives a packet from UART. Uses the timeout set during UART initialization.
+        Returns the full response packet as a bytearray, or None on timeout/error.
+        """
+        # Read header, address, PID and packet length (2 + 4 + 1 + 2 = 9 bytes)
+        response = bytearray(9)
+        n = self.uart.readinto(response)
+        if not n or n < 9:
+            if DEBUG: self.logger.debug("Timeout/Incomplete packet header.")
             return None
         
-        response.extend(pid_len_bytes)
-        pid = pid_len_bytes[0]
-        packet_length_val = ustruct.unpack('>H', pid_len_bytes[1:3])[0]
-        
-        if DEBUG: self.logger.debug("Recv PID: {}, Packet Length Field: {}".format(hex(pid), packet_length_val))
+        packet_length_val = self._parse_header(response)
+        if packet_length_val is None:
+            return None
 
         # Read the rest of the packet (payload + checksum)
-        # packet_length_val is for (Command/Response_data + Checksum_bytes)
-        bytes_to_read = packet_length_val
-        
-        payload_checksum = self.uart.read(bytes_to_read)
-        if not payload_checksum or len(payload_checksum) < bytes_to_read:
-            if DEBUG: self.logger.debug("Timeout/Incomplete payload_checksum. Expected {}, Got {}".format(bytes_to_read, len(payload_checksum) if payload_checksum else 0))
+        payload_checksum = self.uart.read(packet_length_val)
+        if not payload_checksum or len(payload_checksum) < packet_length_val:
+            if DEBUG and self.logger.debug_enabled: self.logger.debug("Timeout/Incomplete payload_checksum. Expected {}, Got {}".format(packet_length_val, len(payload_checksum) if payload_checksum else 0))
             return None
             
         response.extend(payload_checksum)
+        if not self._verify_packet(response, len(response)):
+            return None
+        return response
 
-        if DEBUG:
-            self.logger.debug("Received raw: {}".format(response.hex()))
-
-        # Verify checksum
-        # Data for checksum: PID (from response[6]) + Packet_Length_Bytes (from response[7:9]) + Payload (response[9 : 9 + packet_length_val - 2])
-        data_for_checksum_check = response[6 : 6 + 1 + 2 + (packet_length_val - 2)]
-        calculated_checksum = self._calculate_checksum(data_for_checksum_check)
-        received_checksum = ustruct.unpack('>H', response[6 + 1 + 2 + (packet_length_val - 2) : ])[0]
-
-        if calculated_checksum != received_checksum:
-            self.logger.error("Checksum mismatch! Recv: {}, Calc: {}".format(hex(received_checksum), hex(calculated_checksum)))
-            self.logger.error("Data for checksum: {}".format(data_for_checksum_check.hex()))
+    def _parse_header(self, buf):
+        """
+        Validates the 9-byte header (head + address + PID + length) at the start of buf.
+        Returns the Packet Length field value, or None if the header is invalid.
+        """
+        if ustruct.unpack_from('>H', buf, 0)[0] != PACKET_HEAD:
+            self.logger.error("Invalid packet header received: {}".format(bytes(buf[0:2]).hex()))
             return None
         
-        return response
+        # packet_length_val is for (Command/Response_data + Checksum_bytes)
+        return ustruct.unpack_from('>H', buf, 7)[0]
+
+    def _verify_packet(self, buf, total_len):
+        """Verifies the checksum of the complete packet held in buf[:total_len]."""
+        # One debug line per packet; PID is byte 6 and the length field bytes 7-8 of the raw dump
+        if DEBUG and self.logger.debug_enabled:
+            self.logger.debug("Received raw: {}".format(bytes(buf[:total_len]).hex()))
+        # Data for checksum: PID + Packet_Length_Bytes + Payload, i.e. everything after the address except the checksum
+        calculated_checksum = self._calculate_checksum(buf, 6, total_len - 2)
+        received_checksum = ustruct.unpack_from('>H', buf, total_len - 2)[0]
+        if calculated_checksum != received_checksum:
+            self.logger.error("Checksum mismatch! Recv: {}, Calc: {}".format(hex(received_checksum), hex(calculated_checksum)))
+            self.logger.error("Data for checksum: {}".format(bytes(buf[6 : total_len - 2]).hex()))
+            return False
+        return True
 
-    def _calculate_checksum(self, packet_content):
-        return sum(packet_content) & 0xFFFF
+    def _calculate_checksum(self, buf, start, end):
+        """Checksum over buf[start:end], computed in place."""
+        return _checksum(buf, start, end)
 
     def _build_packet(self, pid, command_code=None, params=None):
-        """Builds a command or data packet."""
-        packet_header = ustruct.pack('>H', PACKET_HEAD)
-        address = ustruct.pack('>I', self.device_addr)
+        """
+        Builds a command or data packet in the shared transmit buffer.
+        Returns a memoryview that is only valid until the next call; copy it with bytes() to keep it.
+        """
+        params_len = len(params) if params else 0
+        # Length of [Command_Code + Params]
+        content_len = (1 if command_code is not None else 0) + params_len
+        
+        buf = self._tx_buf
+        if 9 + content_len + 2 > len(buf):
+            buf = bytearray(9 + content_len + 2) # Oversized packet, leave the shared buffer alone
         
-        # Step 1: Prepare content for length and checksum calculation
-        cmd_and_params = bytearray()
+        # Structure: Header(2) + Addr(4) + PID(1) + Len(2) + Cmd(1) + Params(X) + Checksum(2)
+        # The Packet Length field is for [Command_Code + Params + Checksum_bytes(2)]
+        buf[0:6] = self._hdr_prefix
+        ustruct.pack_into('>BH', buf, 6, pid, content_len + 2)
+        pos = 9
         if command_code is not None:
-            cmd_and_params.append(command_code)
+            buf[pos] = command_code
+            pos += 1
         if params:
-            cmd_and_params.extend(params)
-
-        # Step 2: Calculate Packet Length field value
-        # This length is for [Command_Code + Params + Checksum_bytes(2)]
-        packet_length_value = len(cmd_and_params) + 2 
-        packet_length_bytes = ustruct.pack('>H', packet_length_value)
-
-        # Step 3: Prepare data for checksum calculation
-        # Checksum is over: [PID + Packet_Length_Bytes + Command_Code + Params]
-        data_for_checksum_calc = bytearray()
-        data_for_checksum_calc.append(pid)
-        data_for_checksum_calc.extend(packet_length_bytes)
-        data_for_checksum_calc.extend(cmd_and_params)
+            buf[pos : pos + params_len] = params
+            pos += params_len
         
-        checksum_value = self._calculate_checksum(data_for_checksum_calc)
-        checksum_bytes = ustruct.pack('>H', checksum_value)
-
-        # Step 4: Assemble the final packet
-        # Structure: Header(2) + Addr(4) + PID(1) + Len(2) + Cmd(1) + Params(X) + Checksum(2)
-        final_packet = bytearray()
-        final_packet.extend(packet_header)
-        final_packet.extend(address)
-        final_packet.append(pid)
-        final_packet.extend(packet_length_bytes)
-        final_packet.extend(cmd_and_params)
-        final_packet.extend(checksum_bytes)
+        # Checksum is over: [PID + Packet_Length_Bytes + Command_Code + Params]
+        ustruct.pack_into('>H', buf, pos, self._calculate_checksum(buf, 6, pos))
+        packet = memoryview(buf)[:pos + 2]
         
-        if DEBUG:
-            self.logger.debug("Built packet: {}".format(bytes(final_packet).hex()))
-        return bytes(final_packet)
+        if DEBUG and self.logger.debug_enabled:
+            self.logger.debug("Built packet: {}".format(bytes(packet).hex()))
+        return packet
 
     def _send_packet(self, packet):
         """Sends a packet via UART."""
         self.uart.write(packet)
-        if DEBUG:
-            self.logger.debug("Sent: {}".format(packet.hex()))
+        if DEBUG and self.logger.debug_enabled:
+            self.logger.debug("Sent: {}".format(bytes(packet).hex()))
 
-    async def _receive_packet_async(self):
+    async def _receive_packet_async(self, timeout_ms=TIMEOUT_MS):
         """
-        Asynchronously receives a packet from UART. Uses the timeout set during UART initialization.
-        Returns the full response packet as bytes, or None on timeout/error.
+        Asynchronously receives a packet from UART into the preallocated receive buffer.
+        Returns a memoryview of the packet, valid until the next async receive, or None on timeout/error.
         """
-        response = bytearray()
+        buf = self._rx_buf
+        mv = self._rx_mv
         
-        # Read header and address (2 + 4 = 6 bytes)
-        header_addr = await self._read_async(6)
-        if not header_addr or len(header_addr) < 6:
-            if DEBUG and not header_addr: self.logger.debug("Timeout receiving packet header.")
-            elif DEBUG: self.logger.debug("Incomplete packet header: {}".format(header_addr.hex() if header_addr else "None"))
+        # Read header, address, PID and packet length (2 + 4 + 1 + 2 = 9 bytes)
+        if not await self._readinto_async(mv[0:9], timeout_ms):
+            if DEBUG: self.logger.debug("Timeout receiving packet header.")
             return None
         
-        response.extend(header_addr)
-        if DEBUG: self.logger.debug("Recv Header+Addr: {}".format(header_addr.hex()))
-        if response[0:2] != ustruct.pack('>H', PACKET_HEAD):
-            self.logger.error("Invalid packet header received: {}".format(response[0:2].hex()))
-            return None
-        # Read PID and Packet Length (1 + 2 = 3 bytes)
-        pid_len_bytes = await self._read_async(3)
-        if not pid_len_bytes or len(pid_len_bytes) < 3:
-            if DEBUG: self.logger.debug("Timeout/Incomplete PID+Length.")
+        packet_length_val = self._parse_header(buf)
+        if packet_length_val is None:
             return None
         
-        response.extend(pid_len_bytes)
-        pid = pid_len_bytes[0]
-        packet_length_val = ustruct.unpack('>H', pid_len_bytes[1:3])[0]
-        
-        if DEBUG: self.logger.debug("Recv PID: {}, Packet Length Field: {}".format(hex(pid), packet_length_val))
         # Read the rest of the packet (payload + checksum)
-        # packet_length_val is for (Command/Response_data + Checksum_bytes)
-        bytes_to_read = packet_length_val
+        total_len = 9 + packet_length_val
+        if total_len > len(buf):
+            self.logger.error("Packet length {} exceeds receive buffer.".format(packet_length_val))
+            return None
         
-        payload_checksum = await self._read_async(bytes_to_read)
-        if not payload_checksum or len(payload_checksum) < bytes_to_read:
-            if DEBUG: self.logger.debug("Timeout/Incomplete payload_checksum. Expected {}, Got {}".format(bytes_to_read, len(payload_checksum) if payload_checksum else 0))
+        if not await self._readinto_async(mv[9:total_len]):
+            if DEBUG and self.logger.debug_enabled: self.logger.debug("Timeout/Incomplete payload_checksum. Expected {}".format(packet_length_val))
             return None
             
-        response.extend(payload_checksum)
-        if DEBUG:
-            self.logger.debug("Received raw: {}".format(response.hex()))
-        # Verify checksum
-        # Data for checksum: PID (from response[6]) + Packet_Length_Bytes (from response[7:9]) + Payload (response[9 : 9 + packet_length_val - 2])
-        data_for_checksum_check = response[6 : 6 + 1 + 2 + (packet_length_val - 2)]
-        calculated_checksum = self._calculate_checksum(data_for_checksum_check)
-        received_checksum = ustruct.unpack('>H', response[6 + 1 + 2 + (packet_length_val - 2) : ])[0]
-        if calculated_checksum != received_checksum:
-            self.logger.error("Checksum mismatch! Recv: {}, Calc: {}".format(hex(received_checksum), hex(calculated_checksum)))
-            self.logger.error("Data for checksum: {}".format(data_for_checksum_check.hex()))
+        if not self._verify_packet(buf, total_len):
             return None
-        
-        return response
+        return mv[:total_len]
 
-    async def _read_async(self, num_bytes, timeout_ms=TIMEOUT_MS):
+    async def _readinto_async(self, mv, timeout_ms=TIMEOUT_MS):
         """
-        Asynchronously reads a specified number of bytes from UART with a timeout.
+        Asynchronously fills the memoryview mv from UART with a timeout.
+        Returns True when mv is full, False on timeout.
         """
-        start_time = utime.ticks_ms()
-        buffer = bytearray()
-        while len(buffer) < num_bytes:
-            if utime.ticks_diff(utime.ticks_ms(), start_time) > timeout_ms:
-                return None
-            if self.uart.any():
-                buffer.extend(self.uart.read(num_bytes - len(buffer)))
-            await uasyncio.sleep(0)  # Yield to other tasks
-        return buffer
+        try:
+            await uasyncio.wait_for_ms(self._fill_async(mv), timeout_ms)
+            return True
+        except (uasyncio.TimeoutError, EOFError):
+            return False
+
+    async def _fill_async(self, mv):
+        n = 0
+        while n < len(mv):
+            got = await self._sreader.readinto(mv[n:])
+            if not got:
+                raise EOFError
+            n += got
 
     def _parse_ack_response(self, response_packet):
         """Parses an ACK response packet. Returns (confirm_code, params_bytes)"""
-        if response_packet[6] != PID_ACK: # PID is at index 6
-            self.logger.error("Not an ACK packet: PID={}".format(hex(response_packet[6])))
+        # PID (index 6), packet length (7-8) and confirm code (9)
+        pid, packet_length_field_val, confirm_code = ustruct.unpack_from('>BHB', response_packet, 6)
+        if pid != PID_ACK:
+            self.logger.error("Not an ACK packet: PID={}".format(hex(pid)))
             return None, None
-
-        confirm_code = response_packet[9] # Confirm code is at index 9
-        packet_length_field_val = ustruct.unpack('>H', response_packet[7:9])[0]
         
         params_len = packet_length_field_val - 1 - 2 # -1 for confirm_code, -2 for checksum
         
         params_bytes = None
         if params_len > 0:
-            params_bytes = response_packet[10 : 10 + params_len]
+            # Copy out, the packet may be a view of the shared receive buffer
+            params_bytes = bytes(response_packet[10 : 10 + params_len])
         
-        if DEBUG:
+        if DEBUG and self.logger.debug_enabled:
             self.logger.debug("Parsed ACK: ConfirmCode={}, Params={}".format(hex(confirm_code), params_bytes.hex() if params_bytes else "None"))
         return confirm_code, params_bytes
 
     def _get_error_message(self, confirm_code):
-        # Based on page 7-8 of the manual
-        errors = {
-            0x00: "Command execution OK",
-            0x01: "Data packet reception error", 0x02: "No finger on sensor",
-            0x03: "Fingerprint image entry failed", 0x04: "Fingerprint image too dry/light to generate features",
-            0x05: "Fingerprint image too wet/smudged to generate features", 0x06: "Fingerprint image too messy to generate features",
-            0x07: "Fingerprint image normal, but too few feature points (or area too small) to generate features",
-            0x08: "Fingerprints do not match", 0x09: "Fingerprint not found",
-            0x0a: "Feature merging failed", 0x0b: "Fingerprint library access address out of range",
-            0x0c: "Error reading template from library or template invalid", 0x0d: "Feature upload failed",
-            0x0e: "Module cannot receive subsequent data packets", 0x0f: "Image upload failed",
-            0x10: "Template deletion failed", 0x11: "Fingerprint library clearing failed",
-            0x13: "Incorrect password", 0x15: "No valid original image in buffer to generate image",
-            0x17: "Residual fingerprint or finger not moved between two collections",
-            0x18: "Error reading/writing FLASH", 0x1a: "Invalid register number",
-            0x1b: "Register setting content error", 0x1c: "Notepad page number error",
-            0x1f: "Fingerprint library full", 0x22: "Fingerprint template not empty (when trying to overwrite with no-overwrite flag)",
-            0x23: "Fingerprint template is empty (e.g., for 1:1 verify)", 0x24: "Fingerprint library is empty",
-            0x25: "Enrollment count setting error", 0x26: "Timeout",
-            0x27: "Fingerprint already exists (duplicate)"
-        }
-        return errors.get(confirm_code, "Unknown error code: {}".format(hex(confirm_code)))
-
-    def register_fingerprint(self, finger_id, name):
+        if confirm_code < len(_ERRORS) and _ERRORS[confirm_code]:
+            return _ERRORS[confirm_code]
+        return "Unknown error code: {}".format(hex(confirm_code))
+
+    def has_pending_packet(self):
+        """True if the module has sent data that has not been read yet."""
+        return self.uart.any() > 0
+
+    async def wait_idle(self):
+        """Waits until no async command is waiting on the module."""
+        async with self._uart_lock:
+            pass
+
+    async def register_fingerprint(self, finger_id, name, on_step, report_progress=True):
         """
         Registers a new fingerprint using the PS_AutoEnroll command (0x31).
-        Yields intermediate results.
+        Awaits on_step(result) with each intermediate and the final result
+        (MicroPython has no async generators); return False from it to stop following the enrollment.
         finger_id: The ID to store the fingerprint under (0 to MAX_FINGER_ID-1).
         name: A user-friendly name for this fingerprint.
+        report_progress: If False, the module is told not to report key steps and only the final result is passed to on_step.
         """
+        # Holds the UART for the whole enrollment, every step answer belongs to it
+        async with self._uart_lock:
+            await self._register_fingerprint(finger_id, name, on_step, report_progress)
+
+    async def _register_fingerprint(self, finger_id, name, on_step, report_progress):
         self.logger.info("Starting fingerprint registration for ID: {}, Name: {}".format(finger_id, name))
         if not (0 <= finger_id < MAX_FINGER_ID):
             self.logger.error("Finger ID {} out of range (0-{}).".format(finger_id, MAX_FINGER_ID -1))
-            yield {"status": "error", "message": "Finger ID out of range.", "code": 0xFF} # Custom error
+            await on_step({"status": "error", "message": "Finger ID out of range.", "code": 0xFF}) # Custom error
             return
 
         enroll_id_bytes = ustruct.pack('>H', finger_id)
@@ -382,18 +424,44 @@ class Fingerprint:
 
         # Params for PS_AutoEnroll (0x31):
         # bit0: LED control (1=LED off after image success)
-        # bit2: Return key steps (0=Return key steps)
+        # bit2: Return key steps (0=Return key steps, 1=Final result only)
         # bit3: Allow overwrite ID (0=Not allowed)
         # bit4: Allow duplicate FP registration (0=Allowed by this app's interpretation, module might still flag if exact same data)
         # bit5: Require finger lift (0=Required)
         # Resulting params value: 0b0000000000000001 (LED off, return steps, no overwrite, allow duplicate, require lift)
-        enroll_params_value = 0x0001 
+        # or 0b0000000000000101 when progress is not reported
+        enroll_params_value = 0x0001 if report_progress else 0x0005
         enroll_params_bytes = ustruct.pack('>H', enroll_params_value)
         
         params_data = enroll_id_bytes + enroll_count_byte + enroll_params_bytes
         packet = self._build_packet(PID_COMMAND, CMD_AUTO_ENROLL, params_data)
         self._send_packet(packet)
 
+        if not report_progress:
+            # No key steps: a single answer, the final result, once every capture is done
+            response_packet = await self._receive_packet_async(ENROLL_TIMEOUT_MS)
+            if not response_packet:
+                error_msg = "Timeout or read error waiting for enrollment result."
+                self.logger.error(error_msg)
+                await on_step({"status": "error", "message": error_msg, "code": 0xFE}) # Custom timeout error
+                return
+            confirm_code, _ = self._parse_ack_response(response_packet)
+            if confirm_code is None:
+                error_msg = "Failed to parse response during enrollment."
+                self.logger.error(error_msg)
+                await on_step({"status": "error", "message": error_msg, "code": 0xFD}) # Custom parse error
+            elif confirm_code == 0x00:
+                self.db.add_fingerprint(finger_id, name)
+                success_msg = "Enrollment successful for ID: {}, Name: {}".format(finger_id, name)
+                self.logger.info(success_msg)
+                await on_step({"status": "success", "message": success_msg, "id": finger_id})
+            else:
+                error_msg_text = self._get_error_message(confirm_code)
+                full_error_msg = "Enrollment failed: {} (CC={:02X})".format(error_msg_text, confirm_code)
+                self.logger.error(full_error_msg)
+                await on_step({"status": "error", "message": error_msg_text, "details": full_error_msg, "code": confirm_code})
+            return
+
         current_enroll_attempt = 0
         # Loop enough times to cover all enrollment steps and final module responses
         # Each step should ideally return one ACK from the module.
@@ -403,22 +471,22 @@ class Fingerprint:
         while current_enroll_attempt < max_expected_acks:
             if self._cancel_flag:
                 self.logger.info("Enrollment cancelled by flag.")
-                yield {"status": "cancelled", "message": "Enrollment process cancelled."}
+                await on_step({"status": "cancelled", "message": "Enrollment process cancelled."})
                 self._cancel_flag = False # Reset flag
                 return
 
-            response_packet = self._receive_packet() # Uses TIMEOUT_MS from config
+            response_packet = await self._receive_packet_async() # Uses TIMEOUT_MS from config
             if not response_packet:
                 error_msg = "Timeout or read error during enrollment step {}.".format(current_enroll_attempt)
                 self.logger.error(error_msg)
-                yield {"status": "error", "message": error_msg, "code": 0xFE} # Custom timeout error
+                await on_step({"status": "error", "message": error_msg, "code": 0xFE}) # Custom timeout error
                 return
 
             confirm_code, resp_params = self._parse_ack_response(response_packet)
             if confirm_code is None:
                 error_msg = "Failed to parse response during enrollment."
                 self.logger.error(error_msg)
-                yield {"status": "error", "message": error_msg, "code": 0xFD} # Custom parse error
+                await on_step({"status": "error", "message": error_msg, "code": 0xFD}) # Custom parse error
                 return
 
             param1, param2 = 0, 0
@@ -428,8 +496,8 @@ class Fingerprint:
             elif resp_params and len(resp_params) == 1: # Should generally not happen for 0x31 steps
                 param1 = resp_params[0]
 
-            step_message_raw = "Enroll RAW: CC={:02X}, P1={:02X}, P2={:02X}".format(confirm_code, param1, param2)
-            self.logger.debug(step_message_raw)
+            if DEBUG and self.logger.debug_enabled:
+                self.logger.debug("Enroll RAW: CC={:02X}, P1={:02X}, P2={:02X}".format(confirm_code, param1, param2))
 
             current_status_msg = "Processing enrollment..."
             current_capture_num = None
@@ -454,22 +522,24 @@ class Fingerprint:
                     self.db.add_fingerprint(finger_id, name)
                     success_msg = "Enrollment successful for ID: {}, Name: {}".format(finger_id, name)
                     self.logger.info(success_msg)
-                    yield {"status": "success", "message": success_msg, "id": finger_id}
+                    await on_step({"status": "success", "message": success_msg, "id": finger_id})
                     return
                 else: # Other valid intermediate step
                     current_status_msg = "Enrollment step ongoing (P1={:02X}, P2={:02X})".format(param1, param2)
 
-                yield {
+                if await on_step({
                     "status": "progress", "message": current_status_msg, 
                     "code": confirm_code, "param1": param1, "param2": param2,
                     "current_capture": current_capture_num,
                     "total_captures": ENROLL_COUNT
-                }
+                }) is False:
+                    self.logger.info("Enrollment no longer followed by caller.")
+                    return
             else: # An error occurred at this step
                 error_msg_text = self._get_error_message(confirm_code)
                 full_error_msg = "Enrollment failed: {} (CC={:02X}, P1={:02X}, P2={:02X})".format(error_msg_text, confirm_code, param1, param2)
                 self.logger.error(full_error_msg)
-                yield {"status": "error", "message": error_msg_text, "details": full_error_msg, "code": confirm_code}
+                await on_step({"status": "error", "message": error_msg_text, "details": full_error_msg, "code": confirm_code})
                 return
             
             current_enroll_attempt += 1
@@ -477,23 +547,22 @@ class Fingerprint:
                 pass 
             elif param1 in [0x01, 0x02, 0x03] and param2 > ENROLL_COUNT: # Should not happen
                 self.logger.error("Enrollment step {} exceeded configured count {}.".format(param2, ENROLL_COUNT))
-                yield {"status": "error", "message": "Enrollment step exceeded configured count.", "code": 0xFC}
+                await on_step({"status": "error", "message": "Enrollment step exceeded configured count.", "code": 0xFC})
                 return
 
         # If loop finishes, it means the process didn't complete with a success or specific error state as expected
         timeout_error_msg_loop = "Enrollment process did not complete within expected steps."
         self.logger.error(timeout_error_msg_loop)
-        yield {"status": "error", "message": timeout_error_msg_loop, "code": 0xFB}
+        await on_step({"status": "error", "message": timeout_error_msg_loop, "code": 0xFB})
 
-    def monitor_fingerprint(self):
+    async def monitor_fingerprint(self):
         """
         Monitors for a fingerprint using PS_AutoIdentify (0x32) for 1:N matching.
         Returns True if a fingerprint is matched, False otherwise.
         """
         #self.logger.info("Starting fingerprint monitoring (1:N search)...")
         # Get the status of liveness detection
-        gpio12 = Pin(12, Pin.IN)
-        if gpio12.value() != 1:
+        if self.touch_pin.value() != 1:
             return False
         
         score_level_byte = ustruct.pack('B', SCORE_LEVEL_VERIFY)
@@ -508,14 +577,16 @@ class Fingerprint:
         
         params_data = score_level_byte + search_id_bytes + verify_params_bytes
         packet = self._build_packet(PID_COMMAND, CMD_AUTO_IDENTIFY, params_data)
-        self._send_packet(packet)
+        async with self._uart_lock:
+            self._send_packet(packet)
 
-        response_packet = await self._receive_packet_async() # Uses TIMEOUT_MS from config
-        if not response_packet:
-            self.logger.warning("Timeout or read error during fingerprint monitoring.")
-            return False
+            response_packet = await self._receive_packet_async() # Uses TIMEOUT_MS from config
+            if not response_packet:
+                self.logger.warning("Timeout or read error during fingerprint monitoring.")
+                return False
 
-        confirm_code, resp_params = self._parse_ack_response(response_packet)
+            # Parsed before the lock is released, the packet is a view of the receive buffer
+            confirm_code, resp_params = self._parse_ack_response(response_packet)
         if confirm_code is None:
             self.logger.error("Failed to parse response during monitoring.")
             return False
@@ -549,48 +620,57 @@ class Fingerprint:
         Deletes a fingerprint from the module and the local database.
         finger_id: The ID of the fingerprint to delete.
         """
-        self.logger.info("Attempting to delete fingerprint ID: {}".format(finger_id))
-        
         try:
             fid_int = int(finger_id)
-            if not (0 <= fid_int < MAX_FINGER_ID): # Or actual module max
-                self.logger.error("Invalid Finger ID {} for deletion.".format(fid_int))
-                return False
         except ValueError:
             self.logger.error("Finger ID must be an integer for deletion. Got: {}".format(finger_id))
             return False
+        return self.delete_fingerprints(fid_int, 1)
+
+    def delete_fingerprints(self, start_id, count):
+        """
+        Deletes a contiguous range of fingerprints with a single module command.
+        start_id: First ID to delete.
+        count: Number of consecutive IDs to delete.
+        """
+        self.logger.info("Attempting to delete fingerprint IDs: {}..{}".format(start_id, start_id + count - 1))
 
+        if count < 1 or not (0 <= start_id and start_id + count <= MAX_FINGER_ID): # Or actual module max
+            self.logger.error("Invalid Finger ID range {}+{} for deletion.".format(start_id, count))
+            return False
 
-        page_id_bytes = ustruct.pack('>H', fid_int)
-        delete_count_bytes = ustruct.pack('>H', 1) 
-        
-        params_data = page_id_bytes + delete_count_bytes
+        # The module takes a start page and a count, so a range costs one roundtrip
+        params_data = ustruct.pack('>HH', start_id, count)
         packet = self._build_packet(PID_COMMAND, CMD_DELETE_CHAR, params_data)
         self._send_packet(packet)
 
         response_packet = self._receive_packet()
         if not response_packet:
-            self.logger.error("Timeout or read error during fingerprint deletion for ID: {}.".format(fid_int))
+            self.logger.error("Timeout or read error during fingerprint deletion for IDs: {}+{}.".format(start_id, count))
             return False
 
         confirm_code, _ = self._parse_ack_response(response_packet)
         if confirm_code is None:
-            self.logger.error("Failed to parse delete response for ID: {}.".format(fid_int))
+            self.logger.error("Failed to parse delete response for IDs: {}+{}.".format(start_id, count))
             return False
 
         if confirm_code == 0x00: 
-            self.logger.info("Successfully deleted fingerprint ID: {} from module.".format(fid_int))
-            if self.db.delete_fingerprint(fid_int):
-                self.logger.info("Successfully deleted fingerprint ID: {} from local DB.".format(fid_int))
-            else: # Should not happen if module deletion was successful and ID was valid
-                self.logger.warning("Fingerprint ID: {} deleted from module but not found in local DB (or DB error).".format(fid_int))
+            self.logger.info("Successfully deleted fingerprint IDs: {}+{} from module.".format(start_id, count))
+            if count == 1:
+                if not self.db.delete_fingerprint(start_id): # Should not happen if module deletion was successful and ID was valid
+                    self.logger.warning("Fingerprint ID: {} deleted from module but not found in local DB (or DB error).".format(start_id))
+            else:
+                stored = self.db.get_all_fingerprints()
+                with self.db: # One DB write for the whole range
+                    for fid in [int(k) for k in stored if start_id <= int(k) < start_id + count]:
+                        self.db.delete_fingerprint(fid)
             return True
         else:
             error_msg = self._get_error_message(confirm_code)
-            self.logger.error("Failed to delete fingerprint ID: {} from module. Error: {} (CC={:02X})".format(fid_int, error_msg, confirm_code))
+            self.logger.error("Failed to delete fingerprint IDs: {}+{} from module. Error: {} (CC={:02X})".format(start_id, count, error_msg, confirm_code))
             return False
 
-    def cancel_operation(self):
+    async def cancel_operation(self):
         """
         Sends a PS_Cancel (0x30) command to the module to try and stop
         ongoing automatic operations like enroll or identify.
@@ -599,16 +679,21 @@ class Fingerprint:
         self.logger.info("Sending cancel operation command to module...")
         self._cancel_flag = True # Set flag for cooperative cancellation in enroll
 
-        packet = self._build_packet(PID_COMMAND, CMD_CANCEL)
-        self._send_packet(packet)
+        if self._uart_lock.locked():
+            # An enrollment owns the UART and reads the module's answer; it stops at its next step
+            self._send_packet(self._pkt_cancel)
+            return True
 
-        response_packet = await self._receive_packet_async() # Uses TIMEOUT_MS
-        if not response_packet:
-            self.logger.warning("Timeout or read error during cancel operation response.")
-            # Even if no response, the _cancel_flag is set for the Python side.
-            return False 
+        async with self._uart_lock:
+            self._send_packet(self._pkt_cancel)
 
-        confirm_code, _ = self._parse_ack_response(response_packet)
+            response_packet = await self._receive_packet_async() # Uses TIMEOUT_MS
+            if not response_packet:
+                self.logger.warning("Timeout or read error during cancel operation response.")
+                # Even if no response, the _cancel_flag is set for the Python side.
+                return False 
+
+            confirm_code, _ = self._parse_ack_response(response_packet)
         if confirm_code is None:
             self.logger.error("Failed to parse cancel response from module.")
             return False
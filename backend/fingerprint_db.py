@@ -6,34 +6,90 @@ All comments are in English.
 import ujson
 import uos
 from logger import logger # Use the global logger instance
+from config import MAX_FINGER_ID
 
 DB_FILE_PATH = "fingerprint_db.json" # Store in the root directory
 
 class FingerprintDB:
-    def __init__(self):
+    def __init__(self, max_id=MAX_FINGER_ID):
         self.db_file = DB_FILE_PATH
+        self._tmp_file = DB_FILE_PATH + ".tmp" # Saves go here first, then get renamed over db_file
         self.fingerprints = self._load_db()
+        # Reverse index for get_id_by_name. Names need not be unique, so each maps to a set of IDs.
+        self._name_to_ids = {}
+        for k, v in self.fingerprints.items():
+            self._index_add(v, int(k))
+        self._max_id = max_id
+        # Used-ID bitmap for get_next_available_id, plus a cursor below which no ID is free
+        self._used = bytearray((max_id + 7) // 8)
+        self._free_hint = 0
+        for k in self.fingerprints:
+            self._mark_used(int(k))
+        self._batching = False # Defer saves while inside a `with` block
+        self._dirty = False
+
+    def __enter__(self):
+        """Starts a batch: mutations are only written to flash once, on exit."""
+        self._batching = True
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._batching = False
+        self.flush()
+        return False
+
+    def flush(self):
+        """Writes pending changes to the JSON file, if any."""
+        if self._dirty:
+            self._save_db()
 
     def _load_db(self):
         """Loads fingerprint data from the JSON file."""
         try:
-            with open(self.db_file, "r") as f:
-                data = ujson.load(f)
-                # Ensure keys are integers if they were stored as strings if module IDs are numeric
-                # For simplicity, we'll assume module IDs are used as keys directly if numeric,
-                # or stringified if that's how they are handled.
-                # The fingerprint module uses numeric PageIDs.
-                return {int(k): v for k, v in data.items()}
+            # The DB is small: one read, then parse from memory instead of ujson.load's many small reads
+            try:
+                with open(self.db_file, "rb") as f:
+                    buf = f.read()
+            except OSError:
+                # A save may have been interrupted between writing the temp file and the rename
+                with open(self._tmp_file, "rb") as f:
+                    buf = f.read()
+                logger.warning("Fingerprint DB recovered from {}.".format(self._tmp_file))
+            # Keys stay as the stringified module PageIDs, exactly as JSON stores them,
+            # so saving never has to build a converted copy of the dict.
+            db = ujson.loads(buf)
+            if not isinstance(db, dict):
+                raise ValueError("not a JSON object")
+            # The ID bitmap and name index parse every key; drop entries they can't use
+            # instead of failing at import.
+            bad = [k for k, v in db.items() if not k.isdigit() or not isinstance(v, str)]
+            for k in bad:
+                del db[k]
+            if bad:
+                logger.warning("Fingerprint DB: skipped {} invalid entries.".format(len(bad)))
+            return db
         except (OSError, ValueError) as e:
             logger.info("Fingerprint DB file not found or corrupted, creating new one. Error: {}".format(e))
             return {}
 
     def _save_db(self):
         """Saves the current fingerprint data to the JSON file."""
+        if self._batching:
+            self._dirty = True
+            return
+        self._dirty = False
         try:
-            with open(self.db_file, "w") as f:
-                # Store keys as strings because JSON object keys must be strings.
-                ujson.dump({str(k): v for k, v in self.fingerprints.items()}, f)
+            # Serialize in RAM first: ujson.dump issues one write per token.
+            s = ujson.dumps(self.fingerprints)
+            # Write a temp file and rename it, so a power cut never leaves a truncated DB
+            with open(self._tmp_file, "w") as f:
+                f.write(s)
+            try:
+                uos.rename(self._tmp_file, self.db_file)
+            except OSError:
+                # Some filesystems refuse to rename over an existing file
+                uos.remove(self.db_file)
+                uos.rename(self._tmp_file, self.db_file)
             logger.info("Fingerprint DB saved.")
         except OSError as e:
             logger.error("Failed to save fingerprint DB: {}".format(e))
@@ -46,41 +102,85 @@ class FingerprintDB:
         if self.get_name(finger_id) is not None:
             logger.warning("Fingerprint ID {} already exists in DB. Updating name.".format(finger_id))
         
-        self.fingerprints[finger_id] = str(name)
+        key = str(finger_id)
+        old_name = self.fingerprints.get(key)
+        if old_name is not None:
+            self._index_remove(old_name, finger_id)
+        self.fingerprints[key] = str(name)
+        self._mark_used(finger_id)
+        self._index_add(str(name), finger_id)
         self._save_db()
         logger.info("Added/Updated fingerprint to DB: ID={}, Name={}".format(finger_id, name))
         return True
 
     def get_name(self, finger_id):
         """Retrieves the name associated with a fingerprint ID."""
-        return self.fingerprints.get(int(finger_id))
+        return self.fingerprints.get(str(int(finger_id)))
 
     def get_id_by_name(self, name):
-        """Retrieves the ID associated with a fingerprint name (returns first match)."""
-        for fid, fname in self.fingerprints.items():
-            if fname == name:
-                return fid
-        return None
+        """Retrieves the ID associated with a fingerprint name (lowest ID if several share it)."""
+        ids = self._name_to_ids.get(name)
+        return min(ids) if ids else None
 
     def delete_fingerprint(self, finger_id):
         """Deletes a fingerprint entry from the database by ID."""
         fid_int = int(finger_id)
-        if fid_int in self.fingerprints:
-            del self.fingerprints[fid_int]
+        key = str(fid_int)
+        if key in self.fingerprints:
+            self._index_remove(self.fingerprints.pop(key), fid_int)
+            self._mark_free(fid_int)
             self._save_db()
             logger.info("Deleted fingerprint from DB: ID={}".format(fid_int))
             return True
         logger.warning("Fingerprint ID {} not found in DB for deletion.".format(fid_int))
         return False
 
+    def _index_add(self, name, finger_id):
+        ids = self._name_to_ids.get(name)
+        if ids is None:
+            self._name_to_ids[name] = {finger_id}
+        else:
+            ids.add(finger_id)
+
+    def _index_remove(self, name, finger_id):
+        ids = self._name_to_ids.get(name)
+        if ids is not None:
+            ids.discard(finger_id)
+            if not ids:
+                del self._name_to_ids[name]
+
+    def _mark_used(self, finger_id):
+        if 0 <= finger_id < self._max_id:
+            self._used[finger_id >> 3] |= 1 << (finger_id & 7)
+
+    def _mark_free(self, finger_id):
+        if 0 <= finger_id < self._max_id:
+            self._used[finger_id >> 3] &= ~(1 << (finger_id & 7)) & 0xFF
+            if finger_id < self._free_hint:
+                self._free_hint = finger_id
+
     def get_all_fingerprints(self):
-        """Returns all stored fingerprint ID-name pairs."""
+        """Returns all stored fingerprint ID-name pairs (IDs as strings)."""
         return self.fingerprints
 
     def get_next_available_id(self, max_id):
         """Finds the next available ID up to max_id (0-based)."""
+        if max_id <= self._max_id:
+            used = self._used
+            # Skip whole bytes of used IDs, then find the lowest clear bit
+            for byte_idx in range(self._free_hint >> 3, len(used)):
+                b = used[byte_idx]
+                if b != 0xFF:
+                    bit = 0
+                    while b & 1:
+                        b >>= 1
+                        bit += 1
+                    next_id = (byte_idx << 3) + bit
+                    self._free_hint = next_id
+                    return next_id if next_id < max_id else None
+            return None
         for i in range(max_id): # Assuming IDs are 0 to max_id-1
-            if i not in self.fingerprints:
+            if str(i) not in self.fingerprints:
                 return i
         return None
 
@@ -0,0 +1,17 @@
+# fp_checksum.py
+"""
+Viper-compiled checksum for fingerprint module packets.
+Kept in its own module: firmware built without the native emitter fails to
+compile it, and fingerprint.py then falls back to plain Python.
+All comments are in English.
+"""
+import micropython
+
+@micropython.viper
+def checksum(buf, start: int, end: int) -> int:
+    """Sum of buf[start:end], truncated to 16 bits. Compiled to machine code, no slice is made."""
+    p = ptr8(buf)
+    s = 0
+    for i in range(start, end):
+        s += p[i]
+    return s & 0xFFFF
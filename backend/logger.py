@@ -4,7 +4,9 @@ Custom Logger for MicroPython with log rotation.
 All comments are in English.
 """
 import uos
-import utime
+# Bind the filesystem and clock calls used on every log line once, at import
+from uos import stat as _stat, listdir as _listdir, remove as _remove, rename as _rename
+from utime import time as _time, localtime as _localtime
 from config import LOG_DIR, LOG_FILE_PREFIX, LOG_MAX_SIZE_KB, LOG_MAX_FILES, LOG_LEVEL
 
 # Define log levels
@@ -17,6 +19,9 @@ LOG_LEVELS = {
     "NOTSET": 0,
 }
 
+LOG_FLUSH_LINES = 8 # Flush the open log file after this many buffered lines
+CLOCK_VALID_YEAR = 2024 # An RTC reading earlier than this has not been set from NTP yet
+
 class Logger:
     def __init__(self):
         self.log_dir = LOG_DIR
@@ -24,6 +29,13 @@ class Logger:
         self.max_size_bytes = LOG_MAX_SIZE_KB * 1024
         self.max_files = LOG_MAX_FILES
         self.current_log_level = LOG_LEVELS.get(LOG_LEVEL.upper(), LOG_LEVELS["INFO"])
+        # Check this before building an expensive debug message
+        self.debug_enabled = self.current_log_level <= LOG_LEVELS["DEBUG"]
+        self._ts_cache = (None, "") # (epoch second, formatted timestamp)
+        # main.py may start before WiFi/NTP is up. A file named from the unset clock
+        # is renamed once the clock is valid, so name order stays time order.
+        self._clock_valid = _localtime()[0] >= CLOCK_VALID_YEAR
+        self._relabel = False
         
         # Create log directory if it doesn't exist
         try:
@@ -34,13 +46,71 @@ class Logger:
                 # Fallback to root if dir creation fails
                 self.log_dir = ""
         
+        # Small file naming the active log, so boot doesn't have to list the directory
+        self._pointer = "{}/current".format(self.log_dir)
+
         # Find the most recent log file if it exists and is not full
         self.log_file_path = self._find_or_create_log_file()
 
+        # Keep the active log file open and track its size in memory,
+        # instead of a stat plus open/close for every line.
+        self._fh = None
+        self._size = 0
+        self._unflushed = 0
+        self._open_log_file()
+
+    def _open_log_file(self):
+        try:
+            self._size = _stat(self.log_file_path)[6]
+        except OSError:
+            self._size = 0
+        try:
+            self._fh = open(self.log_file_path, "ab") # Binary: lines are encoded once, in _log
+        except OSError as e:
+            print("Error opening log file: {}".format(e))
+            self._fh = None
+
+    def flush(self):
+        """Flushes buffered log lines to flash."""
+        if self._fh and self._unflushed:
+            try:
+                self._fh.flush()
+            except OSError:
+                pass
+            self._unflushed = 0
+
+    def _write_pointer(self, path):
+        # Write to a temp file and rename so the pointer is never half-written
+        tmp = self._pointer + ".tmp"
+        try:
+            with open(tmp, "w") as f:
+                f.write(path)
+            try:
+                _rename(tmp, self._pointer)
+            except OSError:
+                # Some filesystems refuse to rename over an existing file
+                _remove(self._pointer)
+                _rename(tmp, self._pointer)
+        except OSError as e:
+            print("Error writing log pointer: {}".format(e))
+
     def _find_or_create_log_file(self):
+        try:
+            with open(self._pointer) as f:
+                latest_log_path = f.read().strip()
+            if latest_log_path and _stat(latest_log_path)[6] < self.max_size_bytes:
+                return latest_log_path
+        except OSError:
+            pass # No pointer yet, or it names a missing file: fall back to scanning
+
+        path = self._scan_for_log_file()
+        self._write_pointer(path)
+        return path
+
+    def _scan_for_log_file(self):
         try:
             # Get list of log files
-            log_files = [f for f in uos.listdir(self.log_dir) if f.startswith(self.file_prefix + "-")]
+            log_files = [f for f in _listdir(self.log_dir) if f.startswith(self.file_prefix + "-")]
             
             if not log_files:
                 # No log files exist, create a new one
@@ -53,7 +123,7 @@ class Logger:
             
             # Check if the latest log file is below the size limit
             try:
-                stat = uos.stat(latest_log_path)
+                stat = _stat(latest_log_path)
                 file_size = stat[6]
                 
                 if file_size < self.max_size_bytes:
@@ -70,49 +140,91 @@ class Logger:
             return self._get_new_log_file_path()
 
 
-    def _get_new_log_file_path(self):
-        timestamp = self._get_timestamp()
+    def _get_new_log_file_path(self, timestamp=None):
+        if timestamp is None:
+            timestamp = self._get_timestamp()
         return "{}/{}-{}.log".format(self.log_dir, self.file_prefix, timestamp)
 
     def _get_timestamp(self):
-        # Get current time
-        year, month, day, hour, minute, second, _, _ = utime.localtime()
-        return "{:04d}{:02d}{:02d}-{:02d}{:02d}{:02d}".format(year, month, day, hour, minute, second)
-
-    def _rotate_logs(self):
+        # Lines logged within the same second reuse the last formatted string
+        now = _time()
+        if now == self._ts_cache[0]:
+            return self._ts_cache[1]
+        t = _localtime(now)
+        timestamp = "%04d%02d%02d-%02d%02d%02d" % t[:6]
+        if not self._clock_valid and t[0] >= CLOCK_VALID_YEAR:
+            self._clock_valid = True
+            self._relabel = True
+        self._ts_cache = (now, timestamp)
+        return timestamp
+
+    def _rotate_logs(self, timestamp=None):
+        # Only called once the running size counter says the file is full
+        if self._fh:
+            try:
+                self._fh.close()
+            except OSError:
+                pass
+            self._fh = None
+        self._unflushed = 0
         try:
-            # Check current log file size
-            stat = uos.stat(self.log_file_path)
-            file_size = stat[6]
-
-            if file_size > self.max_size_bytes:
-                # Delete the oldest log file if max_files is reached
-                log_files = [f for f in uos.listdir(self.log_dir) if f.startswith(self.file_prefix + "-")]
-                log_files.sort()
-                if len(log_files) >= self.max_files:
-                    oldest_log = log_files[0]
-                    try:
-                        uos.remove("{}/{}".format(self.log_dir, oldest_log))
-                    except OSError:
-                        pass  # File might not exist, that's fine
-
-                # Create a new log file with a new timestamp
-                self.log_file_path = self._get_new_log_file_path()
+            # Delete the oldest log file if max_files is reached
+            log_files = [f for f in _listdir(self.log_dir) if f.startswith(self.file_prefix + "-")]
+            log_files.sort()
+            if len(log_files) >= self.max_files:
+                oldest_log = log_files[0]
+                try:
+                    _remove("{}/{}".format(self.log_dir, oldest_log))
+                except OSError:
+                    pass  # File might not exist, that's fine
         except OSError:
-            # Likely means self.log_file_path doesn't exist yet, which is fine for the first log
             pass
 
+        # Create a new log file with a new timestamp
+        self.log_file_path = self._get_new_log_file_path(timestamp)
+        self._write_pointer(self.log_file_path)
+        self._open_log_file()
+
+    def _relabel_log_file(self, timestamp):
+        # Give the file opened before the clock was set a name from the real time
+        self._relabel = False
+        self.flush()
+        if self._fh:
+            try:
+                self._fh.close()
+            except OSError:
+                pass
+            self._fh = None
+        new_path = self._get_new_log_file_path(timestamp)
+        try:
+            _rename(self.log_file_path, new_path)
+            self.log_file_path = new_path
+            self._write_pointer(new_path)
+        except OSError:
+            pass # Keep writing under the old name
+        self._open_log_file()
+
     def _log(self, level_name, message):
-        if LOG_LEVELS.get(level_name.upper(), LOG_LEVELS["NOTSET"]) < self.current_log_level:
+        level = LOG_LEVELS.get(level_name.upper(), LOG_LEVELS["NOTSET"])
+        if level < self.current_log_level:
             return
 
-        self._rotate_logs()
         timestamp = self._get_timestamp()
-        log_entry = "{} {}: {}\n".format(timestamp, level_name, message)
+        if self._relabel:
+            self._relabel_log_file(timestamp)
+        if self._size > self.max_size_bytes:
+            self._rotate_logs(timestamp)
+        log_entry = "%s %s: %s\n" % (timestamp, level_name, message) # %-formatting is the cheaper path in MicroPython
 
         try:
-            with open(self.log_file_path, "a") as f:
-                f.write(log_entry)
+            # Size is counted in bytes written; non-ASCII text takes more than one byte per character
+            data = log_entry.encode('utf-8')
+            self._fh.write(data)
+            self._size += len(data)
+            self._unflushed += 1
+            # Warnings and above go to flash right away
+            if self._unflushed >= LOG_FLUSH_LINES or level >= LOG_LEVELS["WARNING"]:
+                self.flush()
         except Exception as e:
             print("Error writing to log file: {}".format(e))
             # Fallback to print if file write fails
@@ -128,7 +240,8 @@ class Logger:
         self._log("WARNING", message)
 
     def debug(self, message):
-        self._log("DEBUG", message)
+        if self.debug_enabled:
+            self._log("DEBUG", message)
 
     def critical(self, message):
         self._log("CRITICAL", message)
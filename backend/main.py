@@ -1,11 +1,10 @@
 # main.py
 """
 Main application entry point for the Fingerprint Access System.
-Initializes components, starts the raw socket web server, 
+Initializes components, starts the uasyncio web server, 
 and manages the fingerprint monitoring loop.
 """
 import uasyncio
-import usocket # For raw socket server
 import utime
 import machine
 
@@ -19,12 +18,20 @@ from servo import ServoControl
 # Import the request handler and component setter from our raw socket API
 from rest_api import handle_http_request, set_components as rest_api_set_components
 
+TOUCH_WAIT_TIMEOUT_MS = 1000 # Safety timeout in case a touch interrupt is missed
+
 # --- Global State and Control ---
-monitoring_control = {
-    'task': None,                   
-    'event': uasyncio.Event(),      
-    'should_run': DEFAULT_MONITORING_ENABLED 
-}
+class MonitorCtl:
+    """Shared state between the monitoring task and the REST API."""
+    __slots__ = ('task', 'event', 'should_run', 'touch_event')
+
+    def __init__(self):
+        self.task = None
+        self.event = uasyncio.Event() # Set while monitoring may run, cleared to pause
+        self.should_run = DEFAULT_MONITORING_ENABLED
+        self.touch_event = uasyncio.ThreadSafeFlag() # Set from the touch pin IRQ
+
+monitoring_control = MonitorCtl()
 
 # Initialize hardware components
 fp_sensor_global = Fingerprint()
@@ -32,83 +39,60 @@ servo_controller_global = ServoControl()
 
 # --- Fingerprint Monitoring Task ---
 async def fingerprint_monitor_loop():
-    logger.info("Fingerprint monitoring task started.")
-    if monitoring_control['should_run']:
-        monitoring_control['event'].set() 
+    # Bind globals to locals once; the loop body only does fast local lookups.
+    # should_run is still read from mc each pass because the REST API mutates it.
+    mc = monitoring_control
+    event = mc.event
+    touch_event = mc.touch_event
+    fp = fp_sensor_global
+    touch_pin = fp.touch_pin
+    servo = servo_controller_global
+    log = logger
+
+    log.info("Fingerprint monitoring task started.")
+    if mc.should_run:
+        event.set() 
 
     while True:
-        if not monitoring_control['should_run']:
-            logger.info("Monitoring loop: 'should_run' is false, pausing.")
-            monitoring_control['event'].clear() 
-            await monitoring_control['event'].wait() 
-            logger.info("Monitoring loop: Resuming as 'should_run' is true and event is set.")
-            if not monitoring_control['should_run']: # Recheck after wait
-                continue
-
-        if not monitoring_control['event'].is_set():
-            logger.debug("Monitoring loop: Paused (event not set). Waiting...")
-            await monitoring_control['event'].wait() 
-            logger.debug("Monitoring loop: Resumed (event set).")
-            if not monitoring_control['should_run']: # Recheck
-                continue 
+        # Single gate: disabled or paused both wait on the event, then recheck from the top
+        if not (mc.should_run and event.is_set()):
+            if not mc.should_run:
+                log.info("Monitoring loop: 'should_run' is false, pausing.")
+                event.clear() 
+            else:
+                log.debug("Monitoring loop: Paused (event not set). Waiting...")
+            await event.wait() 
+            continue
 
         try:
-            if DEBUG: logger.debug("Monitoring loop: Calling fp_sensor.monitor_fingerprint()")
-            match_found = await fp_sensor_global.monitor_fingerprint()
+            if DEBUG: log.debug("Monitoring loop: Calling fp_sensor.monitor_fingerprint()")
+            match_found = await fp.monitor_fingerprint()
             if match_found:
-                logger.info("Monitoring loop: Fingerprint match! Unlocking door.")
-                if servo_controller_global:
-                    servo_controller_global.unlock()
+                log.info("Monitoring loop: Fingerprint match! Unlocking door.")
+                if servo:
+                    await servo.unlock_async()
                     await uasyncio.sleep(DOOR_AUTO_LOCK_DELAY_S)
-                    if monitoring_control['event'].is_set() and monitoring_control['should_run']:
-                         if servo_controller_global.get_status() == "unlocked": 
-                            servo_controller_global.lock()
-                            logger.info("Monitoring loop: Door auto-locked.")
+                    if event.is_set() and mc.should_run:
+                         if servo.get_status() == "unlocked": 
+                            await servo.lock_async()
+                            log.info("Monitoring loop: Door auto-locked.")
                          else:
-                            logger.info("Monitoring loop: Door state changed, not auto-locking.")
+                            log.info("Monitoring loop: Door state changed, not auto-locking.")
                     else:
-                        logger.info("Monitoring loop: Monitoring paused/stopped, not auto-locking.")
+                        log.info("Monitoring loop: Monitoring paused/stopped, not auto-locking.")
+            elif touch_pin.value():
+                await uasyncio.sleep_ms(200) # Finger still on the sensor after a miss; short backoff
             else:
-                await uasyncio.sleep_ms(200) 
+                # Sleep until a finger touches the sensor instead of polling
+                try:
+                    await uasyncio.wait_for_ms(touch_event.wait(), TOUCH_WAIT_TIMEOUT_MS)
+                except uasyncio.TimeoutError:
+                    pass
         
         except Exception as e:
-            logger.error("Monitoring loop: Error: {}".format(e))
+            log.error("Monitoring loop: Error: {}".format(e))
             await uasyncio.sleep_ms(5000) 
 
-        await uasyncio.sleep_ms(200)
-
-# --- Raw Socket Server Task ---
-async def start_raw_socket_server():
-    logger.info("Attempting to start raw socket server on {}:{}".format(API_HOST, API_PORT))
-    
-    addr = usocket.getaddrinfo(API_HOST, API_PORT, 0, usocket.SOCK_STREAM)[0][-1]
-    
-    server_socket = usocket.socket(usocket.AF_INET, usocket.SOCK_STREAM)
-    server_socket.setsockopt(usocket.SOL_SOCKET, usocket.SO_REUSEADDR, 1)
-    server_socket.bind(addr)
-    server_socket.listen(5) # Listen for up to 5 incoming connections
-    
-    logger.info("Raw socket server listening on {}:{}".format(API_HOST, API_PORT))
-
-    while True:
-        try:
-            conn, client_addr = server_socket.accept() # This is blocking in standard socket
-            # For uasyncio, we need to make accept non-blocking or use uasyncio.start_server
-            # MicroPython's socket.accept() is blocking.
-            # The correct way with uasyncio is uasyncio.start_server
-            
-            # The above is incorrect for uasyncio. Let's use uasyncio.start_server
-            # This means handle_http_request needs to be adjusted if it expects raw conn, client_addr
-            # uasyncio.start_server passes StreamReader and StreamWriter to the callback.
-            
-            # `handle_http_request` is already designed for StreamReader and StreamWriter
-            # So, the uasyncio.start_server approach is correct.
-            pass # The loop below is handled by uasyncio.start_server
-
-        except Exception as e:
-            logger.error("Error accepting connection (this part of loop should not be reached with uasyncio.start_server): {}".format(e))
-            await uasyncio.sleep_ms(1000) # Avoid fast spinning on error
-
 # --- Main Application Setup ---
 async def main():
     logger.info("System starting up...")
@@ -119,8 +103,11 @@ async def main():
     # Pass global components to the REST API module
     rest_api_set_components(fp_sensor_global, servo_controller_global, fingerprint_database, monitoring_control)
 
+    # Wake the monitoring task when the module reports a touch
+    fp_sensor_global.touch_pin.irq(trigger=machine.Pin.IRQ_RISING, handler=lambda p: monitoring_control.touch_event.set())
+
     # Create and start the fingerprint monitoring task
-    monitoring_control['task'] = uasyncio.create_task(fingerprint_monitor_loop())
+    monitoring_control.task = uasyncio.create_task(fingerprint_monitor_loop())
     
     # Start the raw socket server using uasyncio.start_server
     # This is the correct way to run an async server with uasyncio
@@ -137,11 +124,11 @@ async def main():
     except Exception as e:
         logger.critical("API Server failed to start or crashed: {}".format(e))
     finally:
-        if monitoring_control['task']:
+        if monitoring_control.task:
             logger.info("Cancelling monitoring task...")
-            monitoring_control['task'].cancel()
+            monitoring_control.task.cancel()
             try:
-                await monitoring_control['task'] # Allow cancellation to complete
+                await monitoring_control.task # Allow cancellation to complete
             except uasyncio.CancelledError:
                 logger.info("Monitoring task successfully cancelled.")
         if servo_controller_global:
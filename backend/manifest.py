@@ -0,0 +1,18 @@
+# manifest.py
+"""
+Optional MicroPython firmware manifest.
+Freezes config.py and the backend modules into the firmware as pre-compiled
+bytecode, so they are loaded from flash instead of being compiled on every boot.
+Build with: make BOARD=<board> FROZEN_MANIFEST=/path/to/backend/manifest.py
+boot.py and main.py are always run from the filesystem and must still be uploaded.
+"""
+include("$(PORT_DIR)/boards/manifest.py")
+
+# config.py must exist (copied from config.example.py) before building
+module("config.py")
+module("logger.py")
+module("fingerprint_db.py")
+module("fp_checksum.py") # Viper code: needs a port whose mpy-cross supports its native arch
+module("fingerprint.py")
+module("servo.py")
+module("rest_api.py")
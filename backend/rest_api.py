@@ -8,7 +8,8 @@ import usocket
 import ujson
 import uos
 import uasyncio
-import ure # For basic path parsing, if needed
+import ure
+from micropython import const
 
 from config import API_TOKEN, LOG_DIR, MAX_FINGER_ID, DEBUG, API_HOST, API_PORT
 from logger import logger
@@ -20,53 +21,146 @@ from logger import logger
 fp_sensor = None
 servo_controller = None
 fingerprint_db = None # This is fingerprint_database from fingerprint_db.py
-monitoring_control = None # Dictionary or class to control monitoring task
+monitoring_control = None # MonitorCtl instance from main.py
 
 # --- HTTP Status Codes ---
-HTTP_STATUS_OK = "200 OK"
-HTTP_STATUS_CREATED = "201 Created"
-HTTP_STATUS_NO_CONTENT = "204 No Content"
-HTTP_STATUS_BAD_REQUEST = "400 Bad Request"
-HTTP_STATUS_UNAUTHORIZED = "401 Unauthorized"
-HTTP_STATUS_FORBIDDEN = "403 Forbidden"
-HTTP_STATUS_NOT_FOUND = "404 Not Found"
-HTTP_STATUS_METHOD_NOT_ALLOWED = "405 Method Not Allowed"
-HTTP_STATUS_INTERNAL_SERVER_ERROR = "500 Internal Server Error"
-HTTP_STATUS_SERVICE_UNAVAILABLE = "503 Service Unavailable"
-HTTP_STATUS_STORAGE_FULL = "507 Insufficient Storage"
+HTTP_STATUS_OK = const(200)
+HTTP_STATUS_CREATED = const(201)
+HTTP_STATUS_NO_CONTENT = const(204)
+HTTP_STATUS_BAD_REQUEST = const(400)
+HTTP_STATUS_UNAUTHORIZED = const(401)
+HTTP_STATUS_FORBIDDEN = const(403)
+HTTP_STATUS_NOT_FOUND = const(404)
+HTTP_STATUS_METHOD_NOT_ALLOWED = const(405)
+HTTP_STATUS_INTERNAL_SERVER_ERROR = const(500)
+HTTP_STATUS_SERVICE_UNAVAILABLE = const(503)
+HTTP_STATUS_STORAGE_FULL = const(507)
+
+# Ready-made status lines, so responses don't format and encode one each time
+_STATUS_LINES = {
+    HTTP_STATUS_OK: b"HTTP/1.1 200 OK\r\n",
+    HTTP_STATUS_CREATED: b"HTTP/1.1 201 Created\r\n",
+    HTTP_STATUS_NO_CONTENT: b"HTTP/1.1 204 No Content\r\n",
+    HTTP_STATUS_BAD_REQUEST: b"HTTP/1.1 400 Bad Request\r\n",
+    HTTP_STATUS_UNAUTHORIZED: b"HTTP/1.1 401 Unauthorized\r\n",
+    HTTP_STATUS_FORBIDDEN: b"HTTP/1.1 403 Forbidden\r\n",
+    HTTP_STATUS_NOT_FOUND: b"HTTP/1.1 404 Not Found\r\n",
+    HTTP_STATUS_METHOD_NOT_ALLOWED: b"HTTP/1.1 405 Method Not Allowed\r\n",
+    HTTP_STATUS_INTERNAL_SERVER_ERROR: b"HTTP/1.1 500 Internal Server Error\r\n",
+    HTTP_STATUS_SERVICE_UNAVAILABLE: b"HTTP/1.1 503 Service Unavailable\r\n",
+    HTTP_STATUS_STORAGE_FULL: b"HTTP/1.1 507 Insufficient Storage\r\n",
+}
+
+# Response head for the enrollment event stream
+_SSE_PREAMBLE = (b"HTTP/1.1 200 OK\r\n"
+                 b"Content-Type: text/event-stream\r\n"
+                 b"Cache-Control: no-cache\r\n"
+                 b"Connection: keep-alive\r\n" # Important for SSE
+                 b"Access-Control-Allow-Origin: *\r\n" # CORS for SSE
+                 b"\r\n") # End of headers
+
+# Headers shared by every JSON response; only Content-Length varies
+_JSON_HEADERS = (b"Content-Type: application/json\r\n"
+                 b"Access-Control-Allow-Origin: *\r\n" # CORS
+                 b"Connection: close\r\n")
+
+MAX_HEADER_BYTES = 2048 # Requests with a larger header block are rejected
+LOG_CHUNK_SIZE = 4096 # Read size when streaming log files
+SSE_COALESCE_BYTES = 256 # Pending enrollment frames are flushed once they reach this size
+
+# Log file names: plain characters only, so no separators or traversal.
+# ure has no counted repetition, the 64-char limit is checked separately.
+_FILENAME_RE = ure.compile(r"^[A-Za-z0-9_.-]+\.log$")
+_MAX_FILENAME_LEN = const(64)
+_LOG_DIR_PREFIX = LOG_DIR + "/" if LOG_DIR else ""
+
+# CORS preflight answer; identical for every request, so it is built once
+_OPTIONS_RESPONSE = (b"HTTP/1.1 204 No Content\r\n"
+                     b"Access-Control-Allow-Origin: *\r\n"
+                     b"Access-Control-Allow-Methods: GET, POST, DELETE, OPTIONS, PUT, PATCH\r\n"
+                     b"Access-Control-Allow-Headers: Content-Type, Authorization\r\n"
+                     b"Access-Control-Max-Age: 86400\r\n" # Cache preflight for 1 day
+                     b"Content-Length: 0\r\n"
+                     b"Connection: close\r\n"
+                     b"\r\n")
+
+
+# --- Connection wrapper ---
+class _CloseOnce:
+    """Wraps a StreamWriter so aclose() only reaches the stream the first time."""
+    def __init__(self, writer):
+        self._writer = writer
+        self.closed = False
+        # Bound once, so writes don't go through the wrapper
+        self.write = writer.write
+        self.drain = writer.drain
+        self.get_extra_info = writer.get_extra_info
+
+    async def aclose(self):
+        if not self.closed:
+            self.closed = True
+            await self._writer.aclose()
 
 
 # --- Helper for managing monitoring ---
 async def pause_monitoring():
-    if monitoring_control and monitoring_control.get('task'): # Check if 'task' key exists
+    if monitoring_control and monitoring_control.task:
         logger.info("API: Pausing fingerprint monitoring.")
-        monitoring_control['event'].clear() # Signal task to pause
-        await uasyncio.sleep_ms(250) # Increased delay
+        monitoring_control.event.clear() # Signal task to pause
+        if fp_sensor:
+            await fp_sensor.wait_idle() # Let an identify already in flight finish with the UART
         logger.info("API: Monitoring pause signalled.")
 
 async def resume_monitoring():
-    if monitoring_control and monitoring_control.get('should_run'): # Check if 'should_run' key exists
+    if monitoring_control and monitoring_control.should_run:
         logger.info("API: Resuming fingerprint monitoring.")
-        monitoring_control['event'].set() # Signal task to resume
+        monitoring_control.event.set() # Signal task to resume
         logger.info("API: Monitoring resume signalled.")
 
 # --- HTTP Request Parsing and Response ---
-async def parse_headers(reader):
-    headers = {}
+async def read_request_head(reader):
+    """
+    Reads the request line and header block with a few bounded reads.
+    Returns (head, body_prefix): head is everything before the blank line,
+    body_prefix whatever was read past it. head is None if the block is
+    larger than MAX_HEADER_BYTES, and empty if the peer sent nothing.
+    """
+    buf = b""
     while True:
-        line = await reader.readline()
-        line = line.decode('utf-8').strip()
-        if not line:
-            break
-        if ':' in line:
-            key, value = line.split(':', 1)
-            headers[key.strip().lower()] = value.strip()
+        end = buf.find(b"\r\n\r\n")
+        if end >= 0:
+            return buf[:end], buf[end + 4:]
+        if len(buf) > MAX_HEADER_BYTES:
+            return None, b""
+        chunk = await reader.read(512)
+        if not chunk: # Peer closed early; use what we have
+            return buf, b""
+        buf += chunk
+
+def parse_headers(head, start):
+    """
+    Parses the header lines in head[start:] by offset, without splitting into lists.
+    Names are lower-cased str; values stay bytes until a handler needs them.
+    """
+    headers = {}
+    end = len(head)
+    while start < end:
+        eol = head.find(b"\r\n", start)
+        if eol < 0:
+            eol = end
+        colon = head.find(b":", start, eol)
+        if colon > start:
+            headers[head[start:colon].strip().lower().decode('utf-8')] = head[colon + 1:eol].strip()
+        start = eol + 2
     return headers
 
-async def read_body(reader, headers):
+async def read_body(reader, headers, body_prefix=b""):
     content_length = int(headers.get('content-length', 0))
     if content_length > 0:
-        body_bytes = await reader.readexactly(content_length)
+        # Part of the body may already have arrived with the headers
+        body_bytes = body_prefix[:content_length]
+        if len(body_bytes) < content_length:
+            body_bytes += await reader.readexactly(content_length - len(body_bytes))
         try:
             return ujson.loads(body_bytes.decode('utf-8'))
         except ValueError:
@@ -74,43 +168,91 @@ async def read_body(reader, headers):
             return None # Or raise an error
     return None
 
-async def send_response(writer, status, headers, body=None):
-    await writer.awrite(b"HTTP/1.1 {}\r\n".format(status))
+def _json_bytes(obj):
+    """Serializes obj to UTF-8 JSON bytes, the form every response writes."""
+    return ujson.dumps(obj).encode('utf-8')
+
+def _warm_json():
+    # The first ujson.loads after boot is several times slower unless ujson has already run once
+    ujson.dumps(None)
+    ujson.loads("null")
+
+_warm_json()
+
+# Scratch buffer for assembling responses. Each one is built and handed to
+# writer.write(), which copies it, with no await in between, so one buffer serves every connection.
+_resp_buf = bytearray(512)
+
+def _as_bytes(value):
+    return value if isinstance(value, (bytes, bytearray)) else str(value).encode('utf-8')
+
+def _append_headers(buf, headers):
     for key, value in headers.items():
-        await writer.awrite(b"{}: {}\r\n".format(key, value))
-    await writer.awrite(b"\r\n")
-    if body:
-        if isinstance(body, str):
-            body = body.encode('utf-8')
-        await writer.awrite(body)
+        buf += _as_bytes(key)
+        buf += b": "
+        buf += _as_bytes(value)
+        buf += b"\r\n"
+
+def _build_head(status, headers):
+    # Status line, header lines and the blank line, assembled in the shared buffer
+    buf = _resp_buf
+    buf[:] = _STATUS_LINES[status]
+    _append_headers(buf, headers)
+    buf += b"\r\n"
+    return buf
+
+def _build_json_response(status, data_dict, extra_headers=None):
+    # Returns the shared buffer: write or copy it before the next await
+    body = _json_bytes(data_dict)
+    buf = _resp_buf
+    buf[:] = _STATUS_LINES[status]
+    buf += _JSON_HEADERS
+    if extra_headers:
+        _append_headers(buf, extra_headers)
+    buf += b"Content-Length: %d\r\n\r\n" % len(body)
+    buf += body
+    return buf
+
+async def send_json_response(writer, status, data_dict, extra_headers=None):
+    writer.write(_build_json_response(status, data_dict, extra_headers))
+    await writer.drain()
     await writer.aclose()
 
-async def send_json_response(writer, status_code_str, data_dict, extra_headers=None):
-    body_json = ujson.dumps(data_dict)
-    headers = {
-        "Content-Type": "application/json",
-        "Content-Length": str(len(body_json)),
-        "Access-Control-Allow-Origin": "*", # CORS
-        "Connection": "close"
-    }
-    if extra_headers:
-        headers.update(extra_headers)
-    await send_response(writer, status_code_str, headers, body_json)
+# Full responses for the fixed-payload endpoints, built on first use.
+# Keys are small tag tuples, so the cache can never grow past a handful of entries.
+_CANNED = {}
+
+async def send_canned_response(writer, key, status, data_dict):
+    response = _CANNED.get(key)
+    if response is None:
+        response = _CANNED[key] = bytes(_build_json_response(status, data_dict))
+    writer.write(response)
+    await writer.drain()
+    await writer.aclose()
 
-async def send_error_response(writer, status_code_str, error_message, details=""):
+async def send_error_response(writer, status, error_message, details=""):
     response_data = {'error': error_message}
     if details:
         response_data['details'] = details
-    await send_json_response(writer, status_code_str, response_data)
+    await send_json_response(writer, status, response_data)
 
 # --- Authentication ---
+# The full expected header value, so a request is checked with one bytes compare
+_EXPECTED_BEARER = ("Bearer " + API_TOKEN).encode('utf-8')
+
 def check_authentication(headers):
     auth_header = headers.get('authorization')
-    if not auth_header or not auth_header.startswith('Bearer '):
-        logger.warning("API: Missing or malformed Authorization header.")
+    if not auth_header:
+        logger.warning("API: Missing Authorization header.")
         return False
-    token = auth_header.split(' ', 1)[1]
-    if token != API_TOKEN:
+    if len(auth_header) != len(_EXPECTED_BEARER):
+        logger.warning("API: Invalid Bearer token.")
+        return False
+    # Constant-time compare: the loop never exits early on the first mismatch
+    diff = 0
+    for a, b in zip(auth_header, _EXPECTED_BEARER):
+        diff |= a ^ b
+    if diff:
         logger.warning("API: Invalid Bearer token.")
         return False
     return True
@@ -120,7 +262,7 @@ async def handle_list_fingerprints(reader, writer, headers, path_params, body):
     logger.info("API: Request to list fingerprints.")
     try:
         all_fps = fingerprint_db.get_all_fingerprints()
-        await send_json_response(writer, HTTP_STATUS_OK, {str(k): v for k, v in all_fps.items()})
+        await send_json_response(writer, HTTP_STATUS_OK, all_fps) # Keys are already strings
     except Exception as e:
         logger.error("API Error listing fingerprints: {}".format(e))
         await send_error_response(writer, HTTP_STATUS_INTERNAL_SERVER_ERROR, "Failed to list fingerprints", str(e))
@@ -172,40 +314,50 @@ async def handle_add_fingerprint_sse(reader, writer, headers, path_params, body)
 
     await pause_monitoring()
     
-    # Send SSE headers
-    await writer.awrite(b"HTTP/1.1 200 OK\r\n")
-    await writer.awrite(b"Content-Type: text/event-stream\r\n")
-    await writer.awrite(b"Cache-Control: no-cache\r\n")
-    await writer.awrite(b"Connection: keep-alive\r\n") # Important for SSE
-    await writer.awrite(b"Access-Control-Allow-Origin: *\r\n") # CORS for SSE
-    await writer.awrite(b"\r\n") # End of headers
+    writer.write(_SSE_PREAMBLE)
+    await writer.drain() # Let the client see the stream open before the first step
+
+    frame = bytearray() # Pending SSE frames, reused for the whole stream
 
     try:
         logger.info("API SSE: Starting enrollment for Name: {}, proposed ID: {}".format(name, new_id))
         
-        enroll_generator = fp_sensor.register_fingerprint(new_id, name)
-        for step_result in enroll_generator:
-            logger.debug("API SSE: Sending step: {}".format(step_result))
-            data_payload = ujson.dumps(step_result)
-            sse_event = "data: {}\n\n".format(data_payload)
+        async def send_step(step_result):
+            if DEBUG and logger.debug_enabled: logger.debug("API SSE: Sending step: {}".format(step_result))
+            frame.extend(b"data: ")
+            frame.extend(_json_bytes(step_result))
+            frame.extend(b"\n\n")
+            # Hold a progress frame back while the module has already queued the next step,
+            # so back-to-back steps share one write. Final results always go out at once.
+            if step_result.get('status') == 'progress' and len(frame) < SSE_COALESCE_BYTES and fp_sensor.has_pending_packet():
+                return True
             try:
-                await writer.awrite(sse_event.encode('utf-8'))
+                writer.write(frame)
+                frame[:] = b""
+                await writer.drain()
             except OSError as e: 
                 logger.warning("API SSE: Client disconnected during stream: {}".format(e))
-                break 
-            
-            if step_result.get("status") in ["success", "error", "cancelled"]:
-                break 
+                return False
+            return True
+        
+        # Returns after the final step (success, error or cancelled) or once the client is gone
+        await fp_sensor.register_fingerprint(new_id, name, send_step)
+        if frame: # Enrollment ended on a held-back progress frame
+            writer.write(frame)
+            await writer.drain()
         
         logger.info("API SSE: Enrollment stream finished for Name: {}".format(name))
 
     except Exception as e:
         logger.error("API SSE: Error during enrollment stream: {}".format(e))
-        error_data = ujson.dumps({'status': 'error', 'message': 'Enrollment process failed on server.', 'details': str(e)})
-        sse_error_event = "data: {}\n\n".format(error_data)
+        error_data = _json_bytes({'status': 'error', 'message': 'Enrollment process failed on server.', 'details': str(e)})
         try:
             # Attempt to send final error message via SSE, if stream is still writable
-            await writer.awrite(sse_error_event.encode('utf-8'))
+            frame.extend(b"data: ")
+            frame.extend(error_data)
+            frame.extend(b"\n\n")
+            writer.write(frame) # Includes any progress frames still held back
+            await writer.drain()
         except OSError as write_e:
             logger.error("API SSE: Failed to write final error to stream (client likely disconnected): {}".format(write_e))
     finally:
@@ -217,16 +369,18 @@ async def handle_add_fingerprint_sse(reader, writer, headers, path_params, body)
 async def handle_servo_unlock(reader, writer, headers, path_params, body):
     logger.info("API: Request to unlock servo.")
     if servo_controller:
-        servo_controller.unlock()
-        await send_json_response(writer, HTTP_STATUS_OK, {'message': 'Servo unlocked.', 'status': servo_controller.get_status()})
+        await servo_controller.unlock_async()
+        status = servo_controller.get_status()
+        await send_canned_response(writer, ("servo_unlocked", status), HTTP_STATUS_OK, {'message': 'Servo unlocked.', 'status': status})
     else:
         await send_error_response(writer, HTTP_STATUS_SERVICE_UNAVAILABLE, "Servo not available.")
 
 async def handle_servo_lock(reader, writer, headers, path_params, body):
     logger.info("API: Request to lock servo.")
     if servo_controller:
-        servo_controller.lock()
-        await send_json_response(writer, HTTP_STATUS_OK, {'message': 'Servo locked.', 'status': servo_controller.get_status()})
+        await servo_controller.lock_async()
+        status = servo_controller.get_status()
+        await send_canned_response(writer, ("servo_locked", status), HTTP_STATUS_OK, {'message': 'Servo locked.', 'status': status})
     else:
         await send_error_response(writer, HTTP_STATUS_SERVICE_UNAVAILABLE, "Servo not available.")
 
@@ -241,30 +395,30 @@ async def handle_servo_status(reader, writer, headers, path_params, body):
 async def handle_monitoring_start(reader, writer, headers, path_params, body):
     logger.info("API: Request to start monitoring.")
     if monitoring_control:
-        monitoring_control['should_run'] = True
-        monitoring_control['event'].set()
+        monitoring_control.should_run = True
+        monitoring_control.event.set()
         logger.info("API: Fingerprint monitoring enabled and started/resumed.")
-        await send_json_response(writer, HTTP_STATUS_OK, {'message': 'Fingerprint monitoring started.'})
+        await send_canned_response(writer, ("monitoring_started",), HTTP_STATUS_OK, {'message': 'Fingerprint monitoring started.'})
     else:
         await send_error_response(writer, HTTP_STATUS_SERVICE_UNAVAILABLE, "Monitoring system not available.")
 
 async def handle_monitoring_stop(reader, writer, headers, path_params, body):
     logger.info("API: Request to stop monitoring.")
     if monitoring_control:
-        monitoring_control['should_run'] = False
-        monitoring_control['event'].clear()
+        monitoring_control.should_run = False
+        monitoring_control.event.clear()
         logger.info("API: Fingerprint monitoring disabled and paused.")
-        await send_json_response(writer, HTTP_STATUS_OK, {'message': 'Fingerprint monitoring stopped.'})
+        await send_canned_response(writer, ("monitoring_stopped",), HTTP_STATUS_OK, {'message': 'Fingerprint monitoring stopped.'})
     else:
         await send_error_response(writer, HTTP_STATUS_SERVICE_UNAVAILABLE, "Monitoring system not available.")
 
 async def handle_monitoring_status(reader, writer, headers, path_params, body):
     logger.info("API: Request for monitoring status.")
     if monitoring_control:
-        status_str = "enabled_and_active" if monitoring_control['should_run'] and monitoring_control['event'].is_set() else \
-                     "enabled_but_paused" if monitoring_control['should_run'] and not monitoring_control['event'].is_set() else \
+        status_str = "enabled_and_active" if monitoring_control.should_run and monitoring_control.event.is_set() else \
+                     "enabled_but_paused" if monitoring_control.should_run and not monitoring_control.event.is_set() else \
                      "disabled"
-        await send_json_response(writer, HTTP_STATUS_OK, {'status': status_str, 'raw_should_run': monitoring_control['should_run']})
+        await send_json_response(writer, HTTP_STATUS_OK, {'status': status_str, 'raw_should_run': monitoring_control.should_run})
     else:
         await send_error_response(writer, HTTP_STATUS_SERVICE_UNAVAILABLE, "Monitoring system not available.")
 
@@ -282,7 +436,7 @@ async def handle_list_logs(reader, writer, headers, path_params, body):
         else:
             try:
                 uos.stat(LOG_DIR) 
-                log_files_list = uos.listdir(LOG_DIR)
+                log_files_list = [f for f in uos.listdir(LOG_DIR) if f.endswith(".log")] # Skip the logger's pointer file
             except OSError: 
                  await send_error_response(writer, HTTP_STATUS_NOT_FOUND, "Log directory does not exist.")
                  return
@@ -294,34 +448,38 @@ async def handle_list_logs(reader, writer, headers, path_params, body):
 async def handle_get_log_file(reader, writer, headers, path_params, body):
     filename = path_params.get('filename')
     logger.info("API: Request for log file: {}".format(filename))
-    if not filename or '..' in filename or filename.startswith('/'):
+    if not filename or len(filename) > _MAX_FILENAME_LEN or not _FILENAME_RE.match(filename):
         await send_error_response(writer, HTTP_STATUS_BAD_REQUEST, "Invalid filename.")
         return
     
-    filepath = "{}/{}".format(LOG_DIR if LOG_DIR else "", filename).strip("/")
+    filepath = _LOG_DIR_PREFIX + filename
+    logger.flush() # The active log file is kept open; push buffered lines first
     
     try:
         stat_info = uos.stat(filepath)
         filesize = stat_info[6]
 
         response_headers = {
-            "Content-Type": "text/plain",
-            "Content-Length": str(filesize),
-            "Access-Control-Allow-Origin": "*",
-            "Connection": "close"
+            b"Content-Type": b"text/plain",
+            b"Content-Length": b"%d" % filesize,
+            b"Access-Control-Allow-Origin": b"*",
+            b"Connection": b"close"
         }
-        await writer.awrite(b"HTTP/1.1 {}\r\n".format(HTTP_STATUS_OK))
-        for key, value in response_headers.items():
-            await writer.awrite(b"{}: {}\r\n".format(key, value))
-        await writer.awrite(b"\r\n")
+        writer.write(_build_head(HTTP_STATUS_OK, response_headers)) # Drained with the first chunk
 
-        chunk_size = 512 
+        # One 4 KiB filesystem block per read, into a buffer reused for the whole file
+        buf = bytearray(LOG_CHUNK_SIZE)
+        mv = memoryview(buf)
+        # Stop at the size announced in Content-Length; the active log may grow meanwhile
+        remaining = filesize
         with open(filepath, "rb") as f: 
-            while True:
-                chunk = f.read(chunk_size)
-                if not chunk:
+            while remaining > 0:
+                n = f.readinto(mv[:min(remaining, LOG_CHUNK_SIZE)])
+                if not n:
                     break
-                await writer.awrite(chunk)
+                writer.write(mv[:n])
+                await writer.drain() # Per chunk, so the stream never buffers the whole file
+                remaining -= n
         await writer.aclose()
 
     except OSError as e:
@@ -333,7 +491,11 @@ async def handle_get_log_file(reader, writer, headers, path_params, body):
             await send_error_response(writer, HTTP_STATUS_INTERNAL_SERVER_ERROR, "Failed to read log file.", str(e))
 
 # --- Simple Router ---
+async def handle_root(reader, writer, headers, path_params, body):
+    await send_json_response(writer, HTTP_STATUS_OK, {"message": "Fingerprint API Server Running"})
+
 ROUTES = [
+    ("GET", "/", handle_root),
     ("GET", "/fingerprints", handle_list_fingerprints),
     ("POST", "/fingerprints", handle_add_fingerprint_sse),
     ("DELETE", "/fingerprints/<finger_id>", handle_delete_fingerprint),
@@ -347,88 +509,106 @@ ROUTES = [
     ("GET", "/logs/<filename>", handle_get_log_file),
 ]
 
-def match_route(method, path):
-    for route_method, route_pattern, handler in ROUTES:
-        if route_method != method:
+def _compile_routes(routes):
+    """
+    Pre-splits route patterns once at import.
+    Returns (static, param): static maps (method, stripped_path) to a handler;
+    param maps (method, n_segments) to [(static_parts, param_indices, param_names, handler), ...],
+    where static_parts holds None in the parameter slots.
+    """
+    static = {}
+    param = {}
+    for route_method, route_pattern, handler in routes:
+        stripped = route_pattern.strip("/")
+        if "<" not in stripped:
+            static[(route_method, stripped)] = handler
             continue
+        parts = stripped.split("/")
+        static_parts = tuple(None if p.startswith("<") and p.endswith(">") else p for p in parts)
+        param_indices = tuple(i for i, p in enumerate(static_parts) if p is None)
+        param_names = tuple(parts[i][1:-1] for i in param_indices)
+        param.setdefault((route_method, len(parts)), []).append((static_parts, param_indices, param_names, handler))
+    return static, param
 
-        path_params = {}
-        pattern_parts = route_pattern.strip("/").split("/")
-        path_parts = path.strip("/").split("/")
-
-        if len(pattern_parts) == len(path_parts):
-            match = True
-            for p_part, path_part in zip(pattern_parts, path_parts):
-                if p_part.startswith("<") and p_part.endswith(">"):
-                    param_name = p_part[1:-1]
-                    path_params[param_name] = path_part
-                elif p_part != path_part:
-                    match = False
-                    break
-            if match:
-                return handler, path_params
-        # Handle root path special case if pattern is "/" (empty after strip and split)
-        elif route_pattern == "/" and path == "/":
-            return handler, {}
-            
-    if path == "/" and method == "GET": 
-        async def handle_root(r, w, h, pp, b):
-            await send_json_response(w, HTTP_STATUS_OK, {"message": "Fingerprint API Server Running"})
-        return handle_root, {}
+_STATIC_ROUTES, _PARAM_ROUTES = _compile_routes(ROUTES)
+
+def match_route(method, path):
+    stripped = path.strip("/")
+    # Most routes have no parameters: one dict lookup
+    handler = _STATIC_ROUTES.get((method, stripped))
+    if handler:
+        return handler, {}
+
+    path_parts = stripped.split("/")
+    # Only routes with the same method and segment count can match
+    for static_parts, param_indices, param_names, handler in _PARAM_ROUTES.get((method, len(path_parts)), ()):
+        for p_part, path_part in zip(static_parts, path_parts):
+            if p_part is not None and p_part != path_part:
+                break
+        else:
+            return handler, {name: path_parts[i] for name, i in zip(param_names, param_indices)}
         
     return None, None
 
 
 # --- Main Request Handler ---
 async def handle_http_request(reader, writer):
+    writer = _CloseOnce(writer) # Response helpers and the SSE handler close it; finally only if they didn't
     addr = writer.get_extra_info('peername')
     logger.info("API: Connection from {}".format(addr))
 
     try:
-        request_line = await reader.readline()
-        if not request_line:
+        head, body_prefix = await read_request_head(reader)
+        if head is None:
+            await send_error_response(writer, HTTP_STATUS_BAD_REQUEST, "Request headers too large.")
+            return
+        if not head:
             logger.warning("API: Empty request line from {}, closing connection.".format(addr))
             # Writer will be closed in finally block
             return
 
-        request_line_str = request_line.decode('utf-8').strip()
-        logger.debug("API Request line: {}".format(request_line_str))
-        
-        parts = request_line_str.split()
-        if len(parts) < 2:
+        # Locate "METHOD SP PATH SP VERSION" by offset instead of splitting
+        line_end = head.find(b"\r\n")
+        if line_end < 0:
+            line_end = len(head)
+        if DEBUG and logger.debug_enabled: logger.debug("API Request line: {}".format(head[:line_end]))
+        sp1 = head.find(b" ", 0, line_end)
+        sp2 = head.find(b" ", sp1 + 1, line_end) if sp1 > 0 else -1
+        if sp2 < 0:
+            sp2 = line_end
+        if sp1 <= 0 or sp2 == sp1 + 1:
             await send_error_response(writer, HTTP_STATUS_BAD_REQUEST, "Malformed request line.")
             # writer is closed by send_error_response
             return 
             
-        method, path = parts[0], parts[1]
-        headers = await parse_headers(reader)
-        logger.debug("API Headers: {}".format(headers))
+        method = head[:sp1].decode('utf-8')
+        path = head[sp1 + 1:sp2].decode('utf-8')
 
         if method == "OPTIONS":
-            cors_headers = {
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "GET, POST, DELETE, OPTIONS, PUT, PATCH",
-                "Access-Control-Allow-Headers": "Content-Type, Authorization",
-                "Access-Control-Max-Age": "86400", # Cache preflight for 1 day
-                "Content-Length": "0"
-            }
-            await send_response(writer, HTTP_STATUS_NO_CONTENT, cors_headers)
-            # writer is closed by send_response
+            # Preflight needs no headers, auth or routing
+            writer.write(_OPTIONS_RESPONSE)
+            await writer.drain()
+            await writer.aclose()
             return
 
+        headers = parse_headers(head, line_end + 2)
+        if DEBUG and logger.debug_enabled: logger.debug("API Headers: {}".format(headers))
+
+        # Reject before touching the body: an unauthorized request's body is never read,
+        # the connection is simply closed after the cached 401.
         if not check_authentication(headers):
-            await send_error_response(writer, HTTP_STATUS_UNAUTHORIZED, "Authentication required.")
-            # writer is closed by send_error_response
+            await send_canned_response(writer, ("unauthorized",), HTTP_STATUS_UNAUTHORIZED, {'error': "Authentication required."})
+            # writer is closed by send_canned_response
             return
 
         body = None
         if method in ["POST", "PUT", "PATCH"]: 
-            body = await read_body(reader, headers)
-            if headers.get('content-type', '').lower() == 'application/json' and body is None and int(headers.get('content-length', 0)) > 0:
+            body = await read_body(reader, headers, body_prefix)
+            if headers.get('content-type', b'').lower() == b'application/json' and body is None and int(headers.get('content-length', 0)) > 0:
                 await send_error_response(writer, HTTP_STATUS_BAD_REQUEST, "Invalid JSON in request body.")
                 # writer is closed by send_error_response
                 return
-        logger.debug("API Body: {}".format(body))
+        if DEBUG and logger.debug_enabled: logger.debug("API Body: {}".format(body))
 
         handler, path_params = match_route(method, path)
 
@@ -455,22 +635,17 @@ async def handle_http_request(reader, writer):
             # If sending the error response fails, the writer is likely unusable.
             # The 'finally' block will still attempt an aclose.
     finally:
-        # This block ensures the writer is closed.
-        # It's called if a handler completed (and already closed the writer),
-        # if an exception occurred (and send_error_response might have closed it),
-        # or if the task was cancelled.
-        # Calling aclose() on an already closed stream is often a no-op or raises a specific error.
-        try:
-            await writer.aclose()
-        except OSError as ose:
-            # This is common if the stream was already closed (e.g., by a successful response,
-            # by the peer, or by a previous aclose call in this handler).
-            # Log as debug as it's often an expected outcome in the finally block.
-            logger.debug("API: OSError during writer.aclose() in 'finally' for {} (stream likely already closed/broken): {}".format(addr, ose))
-        except Exception as e_final_close:
-            # Catch any other unexpected error during this final cleanup 'aclose'.
-            logger.error("API: Unexpected exception during writer.aclose() in 'finally' for {}: {}".format(addr, e_final_close))
-        logger.debug("API: Connection processing finished for {}.".format(addr))
+        # Handlers normally close the writer with their response already;
+        # only close here if none did (empty request, cancellation, failed error reply).
+        if not writer.closed:
+            try:
+                await writer.aclose()
+            except OSError as ose:
+                # The peer may already have dropped the connection
+                if DEBUG and logger.debug_enabled: logger.debug("API: OSError during writer.aclose() in 'finally' for {} (stream likely already closed/broken): {}".format(addr, ose))
+            except Exception as e_final_close:
+                logger.error("API: Unexpected exception during writer.aclose() in 'finally' for {}: {}".format(addr, e_final_close))
+        if DEBUG and logger.debug_enabled: logger.debug("API: Connection processing finished for {}.".format(addr))
 
 
 # --- Function to set global components (called from main.py) ---
@@ -480,6 +655,7 @@ def set_components(fingerprint_sensor_instance, servo_instance, db_instance, mon
     servo_controller = servo_instance
     fingerprint_db = db_instance
     monitoring_control = mon_control_instance
+    _warm_json() # Again right before the server starts taking requests
     logger.info("API components set in rest_api module.")
 
 # --- Server Start Function (called from main.py) ---
@@ -3,10 +3,17 @@ Servo control module for the fingerprint recognition system.
 Implements the servo control functionality for door lock/unlock operations.
 """
 
-from machine import Pin, PWM
+from machine import Pin, PWM, Timer
 import time
+import uasyncio
 from config import *
 
+SERVO_TIMER_ID = 0 # Hardware timer used to step smooth_move_async
+
+# Duty cycle for every whole angle 0-180 (values 25-125 fit in a byte),
+# so stepping the servo is a table read instead of float math
+_DUTY_TABLE = bytes(int(25 + (a / 180) * 100) for a in range(181))
+
 class ServoControl:
     """
     Class for controlling a servo motor for door lock/unlock operations.
@@ -24,6 +31,15 @@ class ServoControl:
         self.pwm = PWM(self.servo_pin, freq=freq)
         self.current_angle = 0
         self.is_locked = True
+        # Timer-driven moves: the timer callback steps the PWM, the caller just awaits
+        self._timer = Timer(SERVO_TIMER_ID)
+        self._tick_cb = self._tick # Bind once instead of on every move
+        # Next angle, last angle and step of the timer move in progress
+        self._move_next = 0
+        self._move_end = 0
+        self._move_step = 1
+        self._move_done = uasyncio.ThreadSafeFlag() # Set from the timer callback
+        self._move_lock = uasyncio.Lock() # One timer move at a time
         self.lock()
     
     def set_angle(self, angle, delay=0.05):
@@ -37,9 +53,7 @@ class ServoControl:
         # Ensure angle is within valid range
         angle = max(0, min(180, angle))
         
-        # Calculate duty cycle
-        duty = int(25 + (angle / 180) * 100)
-        self.pwm.duty(duty)
+        self.pwm.duty(_DUTY_TABLE[angle])
         time.sleep(delay)
         self.current_angle = angle
     
@@ -65,6 +79,45 @@ class ServoControl:
                 self.set_angle(angle, delay)
         
         self.current_angle = end_angle
+
+    async def smooth_move_async(self, start_angle, end_angle, step=1, period_ms=5):
+        """
+        Same motion as smooth_move, but stepped by a hardware timer so the
+        event loop keeps serving other tasks during the move.
+        
+        Args:
+            start_angle: Starting angle in degrees, or None for the angle the
+                servo is at once any previous move has finished
+            end_angle: Ending angle in degrees
+            step: Step size in degrees
+            period_ms: Time between steps in milliseconds
+        """
+        end_angle = max(0, min(180, end_angle))
+
+        async with self._move_lock:
+            if start_angle is None:
+                start_angle = self.current_angle
+            start_angle = max(0, min(180, start_angle))
+            self._move_next = start_angle
+            self._move_end = end_angle
+            self._move_step = step if start_angle <= end_angle else -step
+            self._move_done.clear() # Drop a stale set left by a cancelled move
+            self._timer.init(period=period_ms, mode=Timer.PERIODIC, callback=self._tick_cb)
+            await self._move_done.wait()
+        
+        self.current_angle = end_angle
+
+    def _tick(self, timer):
+        # Timer callback: one PWM step per period, then stop and wake the waiter.
+        # Plain int arithmetic, the same angles range() would give smooth_move.
+        angle = self._move_next
+        if (angle - self._move_end) * self._move_step > 0: # Stepped past the end
+            timer.deinit()
+            self._move_done.set()
+            return
+        self.pwm.duty(_DUTY_TABLE[angle])
+        self.current_angle = angle
+        self._move_next = angle + self._move_step
     
     def unlock(self):
         """
@@ -96,6 +149,36 @@ class ServoControl:
             print(f"Error during lock: {e}")
             return False
     
+    async def unlock_async(self):
+        """
+        Non-blocking unlock, see smooth_move_async.
+        
+        Returns:
+            True if successful
+        """
+        try:
+            await self.smooth_move_async(None, UNLOCK_ANGLE, 1, 5)
+            self.is_locked = False
+            return True
+        except Exception as e:
+            print(f"Error during unlock: {e}")
+            return False
+    
+    async def lock_async(self):
+        """
+        Non-blocking lock, see smooth_move_async.
+        
+        Returns:
+            True if successful
+        """
+        try:
+            await self.smooth_move_async(None, LOCK_ANGLE, 1, 5)
+            self.is_locked = True
+            return True
+        except Exception as e:
+            print(f"Error during lock: {e}")
+            return False
+    
     def get_status(self):
         """Returns the current lock status."""
         if self.is_locked is None:
@@ -106,4 +189,5 @@ class ServoControl:
         """
         Deinitialize the PWM to release the pin.
         """
+        self._timer.deinit()
         self.pwm.deinit()